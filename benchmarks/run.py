@@ -0,0 +1,288 @@
+"""Benchmark fetch, parse and export paths against recorded fixtures.
+
+Run from the repository root:
+
+    python -m benchmarks.run                  # compare with benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline  # record a new baseline
+
+Exits non-zero when a metric regresses by more than ``--tolerance``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.server import FIXTURES, FixtureServer
+from core.cache import ResultCache
+from core.data_export import DataExporter
+from core.esg_engine import ESGEngine
+from core.history import HistoryStore
+from core.ratelimit import HostLimits
+from core.reports import PDFParser
+from core.transport import HTTPTransport
+
+BASELINE = Path(__file__).parent / 'baseline.json'
+# Differences below this many milliseconds are timer noise, whatever the ratio
+NOISE_FLOOR_MS = 0.1
+
+# (benchmark name, country, ticker); US has no plugin, so it exercises the Alpha Vantage fallback
+SINGLE = [
+    ('bursa', 'MY', '1155'),
+    ('jpx', 'JP', '7203'),
+    ('lse', 'GB', 'VOD'),
+    ('deutsche_boerse', 'DE', 'SAP'),
+    ('alpha_vantage', 'US', 'IBM'),
+]
+
+console = Console()
+Results = Dict[str, Dict[str, float]]
+
+def _timed(func: Callable[[], Any], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def _peak_kb(func: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def _latency(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {'p50_ms': statistics.median(ordered) * 1000,
+            'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000}
+
+def _attempt(fetch: Callable[[], Any]) -> Any:
+    # Plugins whose fallback is unimplemented raise; count that as a failed fetch
+    try:
+        return fetch()
+    except Exception as e:
+        return {'error': str(e)}
+
+def bench_single(engine: ESGEngine, repeat: int) -> Results:
+    results = {}
+    for name, country, ticker in SINGLE:
+        outcomes = []
+        samples = _timed(lambda: outcomes.append(_attempt(lambda: engine.refresh(country, ticker))), repeat)
+        ok = sum(1 for data in outcomes if data and 'error' not in data)
+        results[f'single.{name}'] = {**_latency(samples), 'ok': ok, 'total': repeat}
+    return results
+
+def bench_yahoo(transport: HTTPTransport, repeat: int) -> Results:
+    from esg_global import GlobalESGScanner
+    scanner = GlobalESGScanner(cache=ResultCache(':memory:'), transport=transport)
+    outcomes = []
+    samples = _timed(lambda: outcomes.append(_attempt(lambda: scanner._try_yahoo('AAPL'))), repeat)
+    return {'single.yahoo': {**_latency(samples), 'ok': sum(1 for data in outcomes if data and 'error' not in data),
+                             'total': repeat}}
+
+def bench_bulk(engine: ESGEngine, server: FixtureServer, size: int, concurrency: int) -> Results:
+    pairs = [(country, f'{ticker}{i}') for i in range(size // len(SINGLE) + 1)
+             for _, country, ticker in SINGLE][:size]
+
+    def run():
+        return sum(1 for _, _, data in engine.get_esg_data_many(pairs, max_concurrency=concurrency,
+                                                                per_host=concurrency, refresh=True)
+                   if data and 'error' not in data)
+
+    async def run_async():
+        return sum([1 async for _, _, data in engine.aget_esg_data_many(pairs, per_host=concurrency, refresh=True)
+                    if data and 'error' not in data])
+
+    results = {}
+    for name, func in (('bulk.fetch', run), ('bulk.fetch_async', lambda: asyncio.run(run_async()))):
+        before = server.requests
+        start = time.perf_counter()
+        ok = func()
+        elapsed = time.perf_counter() - start
+        results[name] = {'per_second': size / elapsed, 'total_ms': elapsed * 1000,
+                         'requests': server.requests - before, 'peak_kb': _peak_kb(func), 'ok': ok, 'total': size}
+    return results
+
+def bench_parse(repeat: int) -> Results:
+    from core.extract import extract, extract_rows
+    from esg_global import YAHOO_FIELDS
+    from plugins import JP, MY
+
+    # HTML goes through core.extract with the fields its reader asks for
+    readers: Dict[str, Callable[[str], Any]] = {
+        'bursa_company': lambda text: extract(text, MY.FIELDS),
+        'bursa_esg_listing': lambda text: extract_rows(text, MY.LISTING.row, MY.LISTING.key, MY.LISTING.cells),
+        'jpx_listing': lambda text: extract(text, JP.FIELDS),
+        'jpx_esg_listing': lambda text: extract_rows(text, JP.LISTING.row, JP.LISTING.key, JP.LISTING.cells),
+        'yahoo_sustainability': lambda text: extract(text, YAHOO_FIELDS),
+    }
+    # Each parser returns the number of pages it parsed
+    parsers: Dict[str, Callable[[Path], int]] = {
+        'html': lambda path: readers[path.stem](path.read_text('utf-8')) is not None,
+        'xml': lambda path: ET.fromstring(path.read_bytes()) is not None,
+        'json': lambda path: json.loads(path.read_bytes()) is not None,
+        'pdf': lambda path: sum(1 for _ in PDFParser(path, workers=1).pages()),
+    }
+    results = {}
+    for path in sorted(FIXTURES.iterdir()):
+        kind = path.suffix.lstrip('.')
+        if kind not in parsers:
+            continue
+        parse = parsers[kind]
+        pages = int(parse(path))
+        samples = _timed(lambda: parse(path), repeat)
+        # Best of N: parsing is CPU-bound, so slower samples are scheduling noise
+        results[f'parse.{path.stem}'] = {'ms_per_page': min(samples) * 1000 / pages,
+                                         'bytes': path.stat().st_size}
+    return results
+
+def _synthetic_results(tickers: int) -> List[Tuple[str, str, Dict[str, Any]]]:
+    return [('MY', f'{i:04d}', {
+        'company': f'Company {i}',
+        'metrics': [{'name': name, 'value': round(i % 100 / 10, 1), 'source': 'Bursa Malaysia',
+                     'updated': '2024-06-30'} for name in ('Environmental', 'Social', 'Governance', 'ESG Score')]
+    }) for i in range(tickers)]
+
+def bench_export(tickers: int, workdir: Path) -> Results:
+    exporter = DataExporter()
+    exporter.console = Console(quiet=True)
+    data = _synthetic_results(tickers)
+    results = {}
+    for fmt in ('csv', 'xlsx', 'parquet'):
+        target = workdir / f'export.{fmt}'
+
+        def run():
+            return exporter.stream(iter(data), str(target))
+
+        try:
+            start = time.perf_counter()
+            rows = run()
+        except ImportError as e:
+            console.print(f"[yellow]Skipping {fmt} export: {e}[/]")
+            continue
+        elapsed = time.perf_counter() - start
+        results[f'export.{fmt}'] = {'rows_per_second': rows / elapsed, 'peak_kb': _peak_kb(run)}
+    return results
+
+def bench_history(tickers: int, workdir: Path, repeat: int) -> Results:
+    store = HistoryStore(str(workdir / 'history_bench'))
+    data = _synthetic_results(tickers)
+    start = time.perf_counter()
+    for day in range(0, 360, 30):
+        for country, ticker, result in data:
+            store.append(country, ticker, result, observed_at=day * 86400.0)
+    appended = len(data) * 12
+    elapsed = time.perf_counter() - start
+    as_of = _timed(lambda: store.as_of('1970-06-30'), repeat)
+    return {'history.append': {'per_second': appended / elapsed, 'bytes': store.nbytes},
+            'history.as_of': {'p50_ms': statistics.median(as_of) * 1000}}
+
+def run_all(args) -> Results:
+    os.environ.setdefault('ALPHA_VANTAGE_API_KEY', 'benchmark')
+    results: Results = {}
+    with FixtureServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        transport = HTTPTransport(limits=HostLimits(), retries=0, rewrite=server.rewrite())
+        engine = ESGEngine(cache=ResultCache(str(workdir / 'cache.sqlite')), transport=transport,
+                           history=HistoryStore(str(workdir / 'history')))
+
+        results.update(bench_single(engine, args.repeat))
+        results.update(bench_yahoo(transport, args.repeat))
+        results.update(bench_bulk(engine, server, args.bulk, args.concurrency))
+        results.update(bench_parse(args.repeat))
+        results.update(bench_export(args.export_rows, workdir))
+        results.update(bench_history(args.export_rows, workdir, args.repeat))
+        engine.cache.close()
+    return results
+
+def _direction(metric: str) -> int:
+    """+1 when higher is better, -1 when lower is better, 0 when not compared."""
+    if metric.endswith('per_second'):
+        return 1
+    if metric.endswith(('_ms', '_kb', 'ms_per_page')):
+        return -1
+    return 0
+
+def compare(results: Results, baseline: Results, tolerance: float) -> List[Tuple[str, str, float, float]]:
+    """Metrics that got worse than ``baseline`` by more than ``tolerance`` (a fraction)."""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            direction = _direction(metric)
+            if not before or not direction:
+                continue
+            if 'ms' in metric and abs(value - before) < NOISE_FLOOR_MS:
+                continue
+            change = (value - before) / before * direction
+            if change < -tolerance:
+                regressions.append((name, metric, before, value))
+    return regressions
+
+def report(results: Results, baseline: Results, regressions) -> None:
+    regressed = {(name, metric) for name, metric, _, _ in regressions}
+    table = Table(title="Benchmarks")
+    for column in ("Benchmark", "Metric", "Value", "Baseline", "Change"):
+        table.add_column(column, justify="right" if column not in ("Benchmark", "Metric") else "left")
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            change = f"{(value - before) / before:+.0%}" if before and _direction(metric) else ""
+            style = "red" if (name, metric) in regressed else None
+            table.add_row(name, metric, f"{value:,.2f}", "" if before is None else f"{before:,.2f}",
+                          change, style=style)
+    console.print(table)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ESG fetch, parse and export paths")
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="overwrite the baseline with this run")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown before a metric counts as a regression (fraction)")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--bulk', type=int, default=200, help="tickers in the bulk fetch")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds added to each fixture response")
+    parser.add_argument('--export-rows', type=int, default=5000, help="tickers in the export benchmark")
+    parser.add_argument('--output', type=Path, help="also write this run's results as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run_all(args)
+    settings = {'repeat': args.repeat, 'bulk': args.bulk, 'concurrency': args.concurrency,
+                'latency': args.latency, 'export_rows': args.export_rows}
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if stored and stored.get('settings') != settings:
+        console.print(f"[yellow]Baseline was recorded with {stored.get('settings')}; comparisons may not hold[/]")
+    baseline = stored.get('results', {})
+    regressions = [] if args.save_baseline else compare(results, baseline, args.tolerance)
+    report(results, baseline, regressions)
+
+    document = {'settings': settings, 'python': sys.version.split()[0], 'results': results}
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2) + '\n')
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(document, indent=2) + '\n')
+        console.print(f"[green]Baseline saved to {args.baseline}[/]")
+    elif regressions:
+        console.print(f"[red]{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}[/]")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+class FixtureServer:
+    """Local stand-in for the exchange sites, answering from recorded fixtures.
+
+    Requests arrive as ``/<original host>/<original path>`` (see
+    ``HTTPTransport(rewrite=...)``). ``latency`` seconds are added to every
+    response to approximate a remote server.
+    """
+
+    def __init__(self, fixtures: Path = FIXTURES, latency: float = 0.0):
+        with open(fixtures / 'routes.yaml') as f:
+            self.routes: List[Dict] = yaml.safe_load(f)['routes']
+        self.bodies = {route['file']: (fixtures / route['file']).read_bytes() for route in self.routes}
+        self.latency = latency
+        self.requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def rewrite(self) -> Dict[str, str]:
+        """Host rewrite map pointing every recorded host at this server."""
+        return {route['host']: self.base_url for route in self.routes}
+
+    def match(self, host: str, path: str) -> Optional[Dict]:
+        return next((route for route in self.routes
+                     if route['host'] == host and path.startswith(route['path'])), None)
+
+    def start(self) -> 'FixtureServer':
+        fixtures = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                fixtures.requests += 1
+                host, _, path = self.path.lstrip('/').partition('/')
+                route = fixtures.match(host, '/' + path.split('?', 1)[0])
+                if fixtures.latency:
+                    time.sleep(fixtures.latency)
+                if route is None:
+                    self.send_error(404)
+                    return
+                body = fixtures.bodies[route['file']]
+                self.send_response(200)
+                self.send_header('Content-Type', route['type'])
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FixtureServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,11 +1,155 @@
-# In core/analysis.py
-from openai import OpenAI
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
 
-class LLMAnalyzer:
-    def analyze_esg(self, text):
-        client = OpenAI()
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": f"Analyze ESG risks:\n{text}"}]
+from core.cache import ResultCache
+
+MAP_PROMPT = ("Analyze this section of a company report for ESG risks and disclosures. {focus}"
+              "Return key findings as concise bullet points:\n\n{text}")
+REDUCE_PROMPT = ("Combine these ESG findings from different sections of one report into a single "
+                 "deduplicated list of key findings in bullet points. {focus}\n\n{text}")
+
+CHARS_PER_TOKEN = 4
+
+class OpenAIBackend:
+    """Chat-completions backend; the client is created once and reused across calls."""
+
+    def __init__(self, model: str = "gpt-4", api_key: Optional[str] = None):
+        self.model = model
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return f"openai:{self.model}"
+
+    def complete(self, prompt: str) -> str:
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+                self._client = OpenAI(api_key=self.api_key) if self.api_key else OpenAI()
+        response = self._client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}]
         )
-        return response.choices[0].message.content
\ No newline at end of file
+        return response.choices[0].message.content
+
+class StubBackend:
+    """Offline stand-in for tests; answers with ``responder(prompt)`` or a fixed string."""
+
+    name = "stub"
+
+    def __init__(self, responder: Optional[Callable[[str], str]] = None, reply: str = "- No findings"):
+        self.responder = responder
+        self.reply = reply
+        self.prompts = []
+
+    def complete(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return self.responder(prompt) if self.responder else self.reply
+
+class RateLimiter:
+    """Spaces calls at least ``60 / per_minute`` seconds apart across threads."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def chunk_text(text: str, max_tokens: int = 3000, chars_per_token: int = CHARS_PER_TOKEN) -> List[str]:
+    """Split on paragraph boundaries into chunks of roughly ``max_tokens`` tokens."""
+    limit = max_tokens * chars_per_token
+    chunks, current, size = [], [], 0
+    for paragraph in text.split('\n\n'):
+        while len(paragraph) > limit:
+            # Paragraphs longer than a chunk are cut hard
+            chunks.append(paragraph[:limit])
+            paragraph = paragraph[limit:]
+        if size + len(paragraph) > limit and current:
+            chunks.append('\n\n'.join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + 2
+    if any(part.strip() for part in current):
+        chunks.append('\n\n'.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+class LLMAnalyzer:
+    """Map-reduce ESG analysis over full reports.
+
+    Reports are split into token-budgeted chunks, analysed concurrently under a
+    rate limit, and the findings merged. Results for each chunk and each whole
+    report are cached by content hash, so unchanged reports cost nothing and an
+    edited report only re-analyses the chunks that changed.
+    """
+
+    def __init__(self, backend=None, max_workers: int = 4, requests_per_minute: float = 60,
+                 chunk_tokens: int = 3000, cache: Optional[ResultCache] = None):
+        self.backend = backend or OpenAIBackend()
+        self.max_workers = max_workers
+        self.chunk_tokens = chunk_tokens
+        self.limiter = RateLimiter(requests_per_minute)
+        self._cache = cache
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self) -> ResultCache:
+        # Opened on first use, so constructing an analyzer leaves no file behind
+        with self._lock:
+            if self._cache is None:
+                self._cache = ResultCache(path='.esg_llm_cache.sqlite', default_ttl=30 * 86400)
+        return self._cache
+
+    def analyze_esg(self, text: str) -> str:
+        return self.analyze_report(text)
+
+    def analyze_report(self, text: str, focus: str = '') -> str:
+        focus = f"{focus.strip()} " if focus else ''
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest() + '\0' + focus
+        return self._cached('report', key, lambda: self._map_reduce(text, focus))
+
+    def _map_reduce(self, text: str, focus: str) -> str:
+        chunks = chunk_text(text, self.chunk_tokens)
+        if not chunks:
+            return ''
+        findings = self._run_all(MAP_PROMPT, chunks, focus)
+
+        # Reduce in rounds until the combined findings fit one request
+        while len(findings) > 1:
+            groups = chunk_text('\n\n'.join(findings), self.chunk_tokens)
+            if len(groups) >= len(findings):
+                # No two findings fit one request together; cut each to half the budget
+                # and merge them in pairs, so every round still halves the count
+                half = self.chunk_tokens * CHARS_PER_TOKEN // 2 - 1
+                findings = [finding[:half] for finding in findings]
+                groups = ['\n\n'.join(findings[i:i + 2]) for i in range(0, len(findings), 2)]
+            findings = self._run_all(REDUCE_PROMPT, groups, focus)
+        return findings[0]
+
+    def _run_all(self, template: str, parts: List[str], focus: str) -> List[str]:
+        def run(part):
+            prompt = template.format(focus=focus, text=part)
+            return self._cached('prompt', prompt, lambda: self._complete(prompt))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(run, parts))
+
+    def _complete(self, prompt: str) -> str:
+        self.limiter.wait()
+        return self.backend.complete(prompt)
+
+    def _cached(self, kind: str, content: str, compute: Callable[[], str]) -> str:
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        key = (kind, digest, getattr(self.backend, 'name', type(self.backend).__name__))
+        return self.cache.get_or_fetch(key, lambda: {'analysis': compute()})['analysis']
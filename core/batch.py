@@ -0,0 +1,76 @@
+import csv
+import json
+import sys
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from core.data_export import EXPORT_FIELDS, DataExporter, flatten_result
+from core.esg_engine import ESGEngine
+
+def read_pairs(lines: Iterable[str], default_country: str = '') -> Iterator[Tuple[str, str]]:
+    """Parse ``TICKER``, ``COUNTRY TICKER`` or ``COUNTRY,TICKER`` lines lazily.
+
+    Blank lines and ``#`` comments are skipped.
+    """
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        parts = line.replace(',', ' ').split()
+        if len(parts) == 1:
+            yield default_country.upper(), parts[0]
+        else:
+            yield parts[0].upper(), parts[1]
+
+class JSONLinesWriter:
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, country: str, ticker: str, data: Dict[str, Any]):
+        self.stream.write(json.dumps({'country': country, 'ticker': ticker, **data}, default=str))
+        self.stream.write('\n')
+        self.stream.flush()
+
+class CSVWriter:
+    """One row per metric, so the column set stays fixed regardless of plugin."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.writer = csv.writer(stream)
+        self.writer.writerow(EXPORT_FIELDS)
+
+    def write(self, country: str, ticker: str, data: Dict[str, Any]):
+        self.writer.writerows(flatten_result(country, ticker, data))
+        self.stream.flush()
+
+WRITERS = {'jsonl': JSONLinesWriter, 'csv': CSVWriter}
+
+def run_batch(lines: Iterable[str], out: TextIO = sys.stdout, fmt: str = 'jsonl',
+              country: str = '', concurrency: int = 8, per_host: int = 2,
+              timeout: Optional[float] = None, engine: Optional[ESGEngine] = None,
+              output: Optional[str] = None, append: bool = False) -> Dict[str, int]:
+    """Fetch every ticker in ``lines`` and stream results to ``out`` as they finish.
+
+    Nothing is held beyond the in-flight window, so memory does not grow with input
+    size. With ``output`` the results are exported to that csv/xlsx/parquet file instead.
+    """
+    engine = engine or ESGEngine()
+    if timeout is not None:
+        engine.transport.timeout = timeout
+
+    counts = {'ok': 0, 'error': 0}
+    results = engine.get_esg_data_many(read_pairs(lines, country),
+                                       max_concurrency=concurrency, per_host=per_host)
+
+    def counted():
+        for pair_country, ticker, data in results:
+            counts['error' if 'error' in data else 'ok'] += 1
+            yield pair_country, ticker, data
+
+    if output:
+        DataExporter().stream(counted(), output, append=append)
+        return counts
+
+    writer = WRITERS[fmt](out)
+    for pair_country, ticker, data in counted():
+        writer.write(pair_country, ticker, data)
+    return counts
@@ -0,0 +1,145 @@
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from core.instrumentation import metrics
+
+BatchFetch = Callable[[List[str]], Dict[str, Any]]
+
+class NotInBatch(LookupError):
+    """The batch call failed or returned nothing for this ticker; fetch it on its own."""
+
+class MicroBatcher:
+    """Coalesces single-ticker requests into calls of ``fetch_batch``.
+
+    A request to an idle batcher opens a ``window``-second collection window and
+    everything arriving before it closes goes out as one call. Requests arriving
+    while a call is running wait and go out together as soon as it finishes, so
+    batches grow with load without adding latency when idle. A batch is issued
+    early once ``max_batch`` tickers are waiting. Each caller gets a Future for
+    its own ticker; callers asking for a ticker already waiting share its Future.
+    Batches run on ``executor`` (or a thread of their own), never on the caller.
+    A ticker missing from the batch result, or in a batch whose call raised,
+    fails with ``NotInBatch`` so the caller can fetch it on its own.
+    """
+
+    def __init__(self, fetch_batch: BatchFetch, window: float = 0.005, max_batch: int = 100,
+                 source: str = '', executor: Optional[Executor] = None):
+        self.fetch_batch = fetch_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.source = source
+        self.executor = executor
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._generation = 0
+        self._running = 0
+
+    def submit(self, ticker: str) -> Future:
+        with self._lock:
+            future = self._pending.get(ticker)
+            if future is not None:
+                return future
+            future = self._pending[ticker] = Future()
+            if len(self._pending) >= self.max_batch:
+                self._dispatch(self._take())
+            elif len(self._pending) == 1 and not self._running:
+                timer = threading.Timer(self.window, self._expire, args=(self._generation,))
+                timer.daemon = True
+                timer.start()
+        return future
+
+    def get(self, ticker: str, timeout: Optional[float] = None) -> Any:
+        return self.submit(ticker).result(timeout)
+
+    def _expire(self, generation: int):
+        with self._lock:
+            # A full batch may already have gone out and a new window opened since
+            if generation != self._generation or not self._pending:
+                return
+            batch = self._take()
+        self._run(batch)
+
+    def _take(self) -> Dict[str, Future]:
+        batch, self._pending = self._pending, {}
+        self._generation += 1
+        self._running += 1
+        return batch
+
+    def _dispatch(self, batch: Dict[str, Future]):
+        if self.executor is not None:
+            self.executor.submit(self._run, batch)
+        else:
+            threading.Thread(target=self._run, args=(batch,), daemon=True).start()
+
+    def _run(self, batch: Dict[str, Future]):
+        try:
+            self._call(batch)
+        finally:
+            with self._lock:
+                self._running -= 1
+                # Requests that queued behind this call have waited long enough
+                if self._pending and not self._running:
+                    self._dispatch(self._take())
+
+    def _call(self, batch: Dict[str, Future]):
+        metrics.inc('esg_batch_requests_total', source=self.source)
+        metrics.inc('esg_batched_tickers_total', len(batch), source=self.source)
+        try:
+            results = self.fetch_batch(list(batch))
+        except Exception as e:
+            # A failed batch (e.g. its listing page is down) says nothing about the tickers
+            for ticker, future in batch.items():
+                future.set_exception(NotInBatch(f"{self.source or 'batch'} call failed for {ticker}: {e}"))
+            return
+        except BaseException as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for ticker, future in batch.items():
+            if ticker in results:
+                future.set_result(results[ticker])
+            else:
+                future.set_exception(NotInBatch(f"{ticker} missing from {self.source or 'batch'} result"))
+
+class Listing:
+    """An exchange-wide listing page, parsed once into rows and shared for ``ttl`` seconds.
+
+    Concurrent batches wait for a single fetch rather than each downloading and
+    parsing the page. Rows are keyed by the ``key`` attribute of each ``row``
+    element (see core.extract.extract_rows). A failed fetch is remembered for
+    ``retry_after`` seconds, during which ``rows`` fails without trying again.
+    """
+
+    def __init__(self, url: str, row, key: str, cells: Mapping, ttl: float = 300.0,
+                 retry_after: float = 30.0):
+        self.url = url
+        self.row = row
+        self.key = key
+        self.cells = cells
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._rows: Optional[Dict[str, Dict[str, Optional[str]]]] = None
+        self._fetched_at = 0.0
+        self._error: Optional[str] = None
+        self._failed_at = 0.0
+
+    def rows(self, transport) -> Dict[str, Dict[str, Optional[str]]]:
+        with self._lock:
+            now = time.monotonic()
+            if self._rows is not None and now - self._fetched_at <= self.ttl:
+                return self._rows
+            if self._error is not None and now - self._failed_at < self.retry_after:
+                raise RuntimeError(f"{self.url} unavailable: {self._error}")
+            try:
+                response = transport.get(self.url)
+                response.raise_for_status()
+                self._rows = response.extract_rows(self.row, self.key, self.cells)
+            except Exception as e:
+                self._error, self._failed_at = str(e), time.monotonic()
+                raise
+            self._error = None
+            self._fetched_at = time.monotonic()
+            return self._rows
@@ -0,0 +1,214 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.instrumentation import metrics, sample
+
+CacheKey = Tuple[str, str, str]
+
+class ResultCache:
+    """SQLite-backed ESG result cache keyed by (country, ticker, source).
+
+    A small in-memory LRU sits in front of the database so hot tickers never
+    touch disk. Entries past their TTL but within ``stale_ttl`` are served
+    immediately while a background refresh runs (stale-while-revalidate).
+    The database is in WAL mode so engines in several processes (crawl workers)
+    can share it: readers never block the writer, and a writer waits up to
+    ``timeout`` seconds for another to finish.
+    """
+
+    # Writes between full row counts, which pick up rows other processes stored
+    RECOUNT_EVERY = 1000
+
+    def __init__(self, path: str = '.esg_cache.sqlite', default_ttl: int = 86400,
+                 stale_ttl: int = 3600, max_entries: int = 50000, memory_entries: int = 2048,
+                 timeout: float = 60.0):
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.path = path
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0}
+
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()
+        self._refreshing = set()
+        self._accessed = {}
+        self._db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                country TEXT, ticker TEXT, source TEXT,
+                payload TEXT, stored_at REAL, expires_at REAL, accessed_at REAL,
+                PRIMARY KEY (country, ticker, source)
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON results (accessed_at)")
+        self._db.commit()
+        # Kept up to date on every write rather than counted per store; recounted now
+        # and then to take in rows other processes added
+        self._rows = self._count()
+        self._writes = 0
+        metrics.register_collector(self._metric_samples)
+
+    def get(self, key: CacheKey) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Return ``(payload, fresh)``; payload is None on a miss or a fully expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._db.execute(
+                    "SELECT payload, expires_at FROM results WHERE country=? AND ticker=? AND source=?",
+                    key).fetchone()
+                if row is None:
+                    self.stats['misses'] += 1
+                    return None, False
+                entry = (row[0], row[1])
+                self._remember(key, entry)
+            else:
+                self._memory.move_to_end(key)
+
+            # Entries hold JSON, so each caller gets a payload of its own to change
+            encoded, expires_at = entry
+            if now < expires_at:
+                self.stats['hits'] += 1
+                self._touch(key, now)
+                return json.loads(encoded), True
+            if now < expires_at + self.stale_ttl:
+                self.stats['stale_hits'] += 1
+                return json.loads(encoded), False
+
+            self.stats['misses'] += 1
+            return None, False
+
+    def reload(self, key: CacheKey) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """``get`` straight from the database, to see entries other processes have written."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, expires_at FROM results WHERE country=? AND ticker=? AND source=?",
+                key).fetchone()
+            if row is None:
+                return None, False
+            self._remember(key, (row[0], row[1]))
+            return json.loads(row[0]), time.time() < row[1]
+
+    def set(self, key: CacheKey, payload: Dict[str, Any], ttl: Optional[int] = None):
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.default_ttl)
+        encoded = json.dumps(payload)
+        with self._lock:
+            exists = self._db.execute(
+                "SELECT 1 FROM results WHERE country=? AND ticker=? AND source=?", key).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, encoded, now, expires_at, now))
+            if exists is None:
+                self._rows += 1
+            self._flush_access()
+            self._evict()
+            self._db.commit()
+            self._remember(key, (encoded, expires_at))
+
+    def lookup(self, key: CacheKey, fetch: Callable[[], Dict[str, Any]],
+               ttl: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Cached payload or None; a stale one is returned while ``fetch`` refreshes it in the background."""
+        payload, fresh = self.get(key)
+        if payload is not None and not fresh:
+            self._revalidate(key, fetch, ttl)
+        return payload
+
+    def get_or_fetch(self, key: CacheKey, fetch: Callable[[], Dict[str, Any]],
+                     ttl: Optional[int] = None) -> Dict[str, Any]:
+        payload = self.lookup(key, fetch, ttl)
+        if payload is not None:
+            return payload
+
+        payload = fetch()
+        if payload and 'error' not in payload:
+            self.set(key, payload, ttl)
+        return payload
+
+    def invalidate(self, key: CacheKey):
+        with self._lock:
+            self._memory.pop(key, None)
+            deleted = self._db.execute(
+                "DELETE FROM results WHERE country=? AND ticker=? AND source=?", key).rowcount
+            self._rows -= deleted
+            self._db.commit()
+
+    def hit_rate(self) -> float:
+        served = self.stats['hits'] + self.stats['stale_hits']
+        total = served + self.stats['misses']
+        return served / total if total else 0.0
+
+    def _metric_samples(self) -> Dict:
+        samples = {sample('esg_cache_events', cache=self.path, event=event): count
+                   for event, count in self.stats.items()}
+        samples[sample('esg_cache_hit_ratio', cache=self.path)] = self.hit_rate()
+        return samples
+
+    def close(self):
+        with self._lock:
+            self._flush_access()
+            self._db.commit()
+            self._db.close()
+
+    def _revalidate(self, key: CacheKey, fetch: Callable[[], Dict[str, Any]], ttl: Optional[int]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                payload = fetch()
+                if payload and 'error' not in payload:
+                    self.set(key, payload, ttl)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _remember(self, key: CacheKey, entry: Tuple[str, float]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key: CacheKey, now: float):
+        # Access times only drive eviction order, so they are batched in memory
+        # and written out with the next store to keep reads off disk
+        self._accessed[key] = now
+
+    def _flush_access(self):
+        if self._accessed:
+            self._db.executemany(
+                "UPDATE results SET accessed_at=? WHERE country=? AND ticker=? AND source=?",
+                [(at, *key) for key, at in self._accessed.items()])
+            self._accessed.clear()
+
+    def _count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def _evict(self):
+        self._writes += 1
+        if self._writes % self.RECOUNT_EVERY == 0:
+            self._rows = self._count()
+        excess = self._rows - self.max_entries
+        if excess <= 0:
+            return
+        victims = self._db.execute(
+            "SELECT country, ticker, source FROM results ORDER BY accessed_at LIMIT ?",
+            (excess,)).fetchall()
+        self._db.executemany(
+            "DELETE FROM results WHERE country=? AND ticker=? AND source=?", victims)
+        for victim in victims:
+            self._memory.pop(tuple(victim), None)
+        self._rows -= len(victims)
+        self.stats['evictions'] += len(victims)
@@ -0,0 +1,290 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from core.esg_engine import ESGEngine
+
+STATUSES = ('pending', 'running', 'done', 'failed')
+
+class CrawlQueue:
+    """SQLite work queue of (country, ticker) tasks shared by crawl worker processes.
+
+    Tasks carry the exchange host their source is fetched from (the ``exchange``
+    column), and workers claim them in chunks from one exchange at a time. An
+    exchange with tasks running on one worker is not handed to another, so
+    ``per_host`` and the host's rate limits hold across the whole crawl rather
+    than once per process. Results are written back to the queue, which is
+    therefore also the checkpoint: a crawl restarted on the same file skips
+    every finished task.
+    """
+
+    def __init__(self, path: str = '.esg_crawl.sqlite'):
+        self.path = path
+        # Transactions are managed explicitly so claims can take the write lock up front
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY, country TEXT, ticker TEXT, exchange TEXT,
+                status TEXT DEFAULT 'pending', attempts INTEGER DEFAULT 0, worker INTEGER,
+                fetched_at REAL, payload TEXT, recorded INTEGER DEFAULT 0,
+                UNIQUE (country, ticker)
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_status ON tasks (status, exchange, id)")
+
+    def add(self, tasks: Iterable[Tuple[str, str, str]]) -> int:
+        """Queue (country, ticker, exchange) tasks; ones already queued are left as they are."""
+        before = self.db.total_changes
+        with self._transaction():
+            self.db.executemany(
+                "INSERT OR IGNORE INTO tasks (country, ticker, exchange) VALUES (?, ?, ?)", tasks)
+        return self.db.total_changes - before
+
+    def claim(self, worker: int, limit: int) -> List[Tuple[str, str]]:
+        """Mark up to ``limit`` pending tasks of one exchange as running on ``worker``.
+
+        Only exchanges no other worker has tasks running on are considered, so
+        this can come back empty while tasks are still pending.
+        """
+        with self._transaction('IMMEDIATE'):
+            row = self._free_exchange(worker)
+            if row is None:
+                return []
+            return self.db.execute(
+                "UPDATE tasks SET status='running', worker=?, attempts=attempts+1 WHERE id IN ("
+                "  SELECT id FROM tasks WHERE status='pending' AND exchange IS ? ORDER BY id LIMIT ?)"
+                " RETURNING country, ticker", (worker, row[0], limit)).fetchall()
+
+    def complete(self, results: List[Tuple[str, str, Dict[str, Any], float]], max_attempts: int = 1):
+        """Store results; failed tasks go back to pending until they have had ``max_attempts``."""
+        with self._transaction():
+            self.db.executemany(
+                "UPDATE tasks SET worker=NULL, fetched_at=?, payload=?, status=CASE"
+                "  WHEN ? THEN 'done' WHEN attempts < ? THEN 'pending' ELSE 'failed' END"
+                " WHERE country=? AND ticker=?",
+                [(fetched_at, json.dumps(data, default=str), 'error' not in data, max_attempts,
+                  country, ticker) for country, ticker, data, fetched_at in results])
+
+    def requeue(self, worker: Optional[int] = None) -> int:
+        """Return running tasks (of one worker, or all) to pending, e.g. after a crash."""
+        query = "UPDATE tasks SET status='pending', worker=NULL WHERE status='running'"
+        args = ()
+        if worker is not None:
+            query += " AND worker=?"
+            args = (worker,)
+        return self.db.execute(query, args).rowcount
+
+    def retry_failed(self) -> int:
+        return self.db.execute(
+            "UPDATE tasks SET status='pending', attempts=0 WHERE status='failed'").rowcount
+
+    def claimable(self) -> bool:
+        """Whether some exchange has pending tasks and none running."""
+        return self._free_exchange(None) is not None
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(self.db.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+        return counts
+
+    def results(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Finished tasks as (country, ticker, data), in the order they were queued."""
+        rows = self.db.execute(
+            "SELECT country, ticker, payload FROM tasks WHERE status IN ('done', 'failed') ORDER BY id")
+        for country, ticker, payload in rows:
+            yield country, ticker, json.loads(payload)
+
+    def unrecorded(self) -> List[Tuple[int, str, str, Dict[str, Any], float]]:
+        return [(task_id, country, ticker, json.loads(payload), fetched_at)
+                for task_id, country, ticker, payload, fetched_at in self.db.execute(
+                    "SELECT id, country, ticker, payload, fetched_at FROM tasks"
+                    " WHERE status='done' AND recorded=0 ORDER BY id")]
+
+    def mark_recorded(self, ids: Iterable[int]):
+        with self._transaction():
+            self.db.executemany("UPDATE tasks SET recorded=1 WHERE id=?", [(i,) for i in ids])
+
+    def close(self):
+        self.db.close()
+
+    def _free_exchange(self, worker: Optional[int]) -> Optional[Tuple[str]]:
+        # The oldest pending task's exchange among those not running on another worker
+        return self.db.execute(
+            "SELECT exchange FROM tasks AS t WHERE status='pending' AND NOT EXISTS ("
+            "  SELECT 1 FROM tasks WHERE status='running' AND exchange IS t.exchange AND worker IS NOT ?)"
+            " ORDER BY id LIMIT 1", (worker,)).fetchone()
+
+    def _transaction(self, mode: str = 'DEFERRED'):
+        return _Transaction(self.db, mode)
+
+class _Transaction:
+    def __init__(self, db: sqlite3.Connection, mode: str):
+        self.db = db
+        self.mode = mode
+
+    def __enter__(self):
+        self.db.execute(f"BEGIN {self.mode}")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+class Crawler:
+    """Shards a ticker universe across worker processes, each running its own ESGEngine.
+
+    Parsing is CPU-bound, so one process per core keeps throughput growing with
+    the machine rather than with the GIL. Tickers are routed with
+    config/countries.yaml and queued in a ``CrawlQueue`` at ``state_path``;
+    workers pull chunks of ``chunk`` tickers from one exchange and checkpoint
+    results every ``checkpoint`` seconds. Re-running against the same state file
+    resumes: finished tickers are skipped and ones that were in flight when a
+    worker or the coordinator died are fetched again. A dead worker is replaced.
+    ``concurrency`` applies within each worker; since an exchange is worked by
+    one process at a time, ``per_host`` and the rate limits in
+    config/sources.yaml hold for the crawl as a whole. History is recorded by
+    the coordinator, the one process allowed to write the store.
+    """
+
+    def __init__(self, state_path: str = '.esg_crawl.sqlite', workers: Optional[int] = None,
+                 chunk: int = 200, concurrency: int = 8, per_host: int = 2,
+                 timeout: Optional[float] = None, attempts: int = 2, checkpoint: float = 1.0,
+                 engine: Optional[ESGEngine] = None,
+                 on_progress: Optional[Callable[[Dict[str, int]], None]] = None):
+        self.state_path = state_path
+        self.workers = workers or os.cpu_count() or 1
+        self.options = {'chunk': chunk, 'concurrency': concurrency, 'per_host': per_host,
+                        'timeout': timeout, 'attempts': attempts, 'checkpoint': checkpoint}
+        self.engine = engine or ESGEngine()
+        self.on_progress = on_progress
+        self.queue = CrawlQueue(state_path)
+
+    def add(self, pairs: Iterable[Tuple[str, str]]) -> int:
+        """Queue tickers for the crawl; pairs with an empty country are routed by suffix."""
+        return self.queue.add((country, ticker, self._exchange(country))
+                              for country, ticker in self.engine.resolve_many(pairs))
+
+    def run(self, poll: float = 0.5, max_restarts: Optional[int] = None) -> Dict[str, int]:
+        """Crawl every pending ticker and return the final task counts."""
+        # Anything still running belongs to a coordinator that did not finish
+        self.queue.requeue()
+        context = multiprocessing.get_context('spawn')
+        max_restarts = self.workers * 3 if max_restarts is None else max_restarts
+        restarts = 0
+        processes = {}
+        for worker in range(min(self.workers, max(1, self.queue.counts()['pending']))):
+            processes[worker] = self._start(context, worker)
+
+        try:
+            while processes:
+                time.sleep(poll)
+                for worker, process in list(processes.items()):
+                    if process.exitcode is None:
+                        continue
+                    del processes[worker]
+                    if process.exitcode == 0:
+                        continue
+                    self.queue.requeue(worker)
+                    restarts += 1
+                    if restarts > max_restarts:
+                        raise RuntimeError(f"Crawl workers keep dying (last exit code {process.exitcode})")
+                    processes[worker] = self._start(context, worker)
+                self._record_history()
+                counts = self.queue.counts()
+                if self.on_progress is not None:
+                    self.on_progress(counts)
+                # Workers leave when every exchange with work is taken; start one again once
+                # an exchange frees up (or failed tasks were re-queued after all ran dry)
+                idle = [worker for worker in range(self.workers) if worker not in processes]
+                if idle and counts['pending'] and self.queue.claimable():
+                    processes[idle[0]] = self._start(context, idle[0])
+        finally:
+            for process in processes.values():
+                process.terminate()
+                process.join()
+            if processes:
+                self.queue.requeue()
+        self._record_history()
+        return self.queue.counts()
+
+    def results(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        return self.queue.results()
+
+    def _exchange(self, country: str) -> str:
+        # Rate limits are per host, so tasks are grouped by the host their source is fetched
+        # from; every country without a plugin shares the generic API's
+        return self.engine._host_key(country)
+
+    def _start(self, context, worker: int):
+        process = context.Process(target=_work, args=(self.state_path, worker, self.options),
+                                  name=f'esg-crawl-{worker}', daemon=True)
+        process.start()
+        return process
+
+    def _record_history(self):
+        history = self.engine.history
+        if history is None:
+            return
+        rows = self.queue.unrecorded()
+        for _, country, ticker, data, fetched_at in rows:
+            history.append(country, self.engine.routing.symbol(ticker, country), data, fetched_at)
+        if rows:
+            self.queue.mark_recorded(task_id for task_id, *_ in rows)
+
+def _work(state_path: str, worker: int, options: Dict[str, Any]):
+    """Worker process: fetch claimed tasks until no exchange with work left is free."""
+    queue = CrawlQueue(state_path)
+    # A transport of its own, so the timeout leaves the process-wide default alone
+    transport = None
+    if options['timeout'] is not None:
+        from core.transport import HTTPTransport
+        transport = HTTPTransport.from_config(timeout=options['timeout'])
+    engine = ESGEngine(transport=transport)
+    # The store has a single writer; the coordinator records what workers fetch
+    engine.history = None
+
+    def claimed():
+        while True:
+            tasks = queue.claim(worker, options['chunk'])
+            if not tasks:
+                # Whatever is left belongs to exchanges other workers are on
+                return
+            yield from tasks
+
+    done = []
+    last_checkpoint = time.monotonic()
+    for country, ticker, data in engine.get_esg_data_many(
+            claimed(), max_concurrency=options['concurrency'], per_host=options['per_host']):
+        done.append((country, ticker, data, time.time()))
+        if time.monotonic() - last_checkpoint >= options['checkpoint']:
+            queue.complete(done, options['attempts'])
+            done = []
+            last_checkpoint = time.monotonic()
+    queue.complete(done, options['attempts'])
+    queue.close()
+
+def run_crawl(lines: Optional[Iterable[str]], out: TextIO = sys.stdout, fmt: str = 'jsonl',
+              country: str = '', output: Optional[str] = None, retry_failed: bool = False,
+              **options) -> Dict[str, int]:
+    """Queue ``lines`` (if any), crawl until the queue is drained and write the merged results."""
+    from core.batch import WRITERS, read_pairs
+    from core.data_export import DataExporter
+
+    crawler = Crawler(**options)
+    if lines is not None:
+        crawler.add(read_pairs(lines, country))
+    if retry_failed:
+        crawler.queue.retry_failed()
+    counts = crawler.run()
+
+    if output:
+        DataExporter().stream(crawler.results(), output)
+    else:
+        writer = WRITERS[fmt](out)
+        for result in crawler.results():
+            writer.write(*result)
+    crawler.queue.close()
+    return counts
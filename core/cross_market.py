@@ -0,0 +1,154 @@
+import math
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.metrics_store import parse_value
+from core.routing import get_routing
+from plugins._utils import sustainability_metrics_normalizer
+
+class _Group:
+    """Sorted (value, ticker) list plus running sums for one metric within one slice."""
+
+    __slots__ = ('entries', 'total', 'total_sq')
+
+    def __init__(self):
+        self.entries = []
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def add(self, value: float, ticker: str):
+        insort(self.entries, (value, ticker))
+        self.total += value
+        self.total_sq += value * value
+
+    def remove(self, value: float, ticker: str):
+        i = bisect_left(self.entries, (value, ticker))
+        if i < len(self.entries) and self.entries[i] == (value, ticker):
+            del self.entries[i]
+            self.total -= value
+            self.total_sq -= value * value
+
+    def percentile(self, value: float) -> float:
+        below = bisect_left(self.entries, (value,))
+        at_or_below = bisect_left(self.entries, (math.nextafter(value, math.inf),))
+        return 100.0 * (below + at_or_below) / (2 * len(self.entries))
+
+    def summary(self) -> Dict[str, float]:
+        n = len(self.entries)
+        mean = self.total / n
+        variance = max(self.total_sq / n - mean * mean, 0.0)
+        return {'count': n, 'mean': mean, 'std': math.sqrt(variance),
+                'min': self.entries[0][0], 'max': self.entries[-1][0]}
+
+class CrossMarketIndex:
+    """Incrementally maintained indexes over fetched ESG results.
+
+    Each numeric metric is kept in sorted groups for the whole universe, per
+    country and per exchange, so percentile ranks, top-N, peer lookups and
+    country aggregates are answered by binary search instead of a rescan.
+    Re-adding a ticker replaces its previous values.
+    """
+
+    SCOPES = ('all', 'country', 'exchange')
+
+    def __init__(self, normalize: bool = False):
+        self.normalize = normalize
+        self.tickers = {}
+        self.groups = defaultdict(_Group)
+
+    def add(self, country: str, ticker: str, result: Dict[str, Any]):
+        if not result or 'error' in result:
+            return
+        self.remove(ticker)
+
+        values = {}
+        for metric in result.get('metrics', []):
+            if not metric or not metric.get('name'):
+                continue
+            value = parse_value(metric.get('value'))
+            if self.normalize:
+                value = sustainability_metrics_normalizer([value], [metric.get('source') or ''])[0]
+            if not math.isnan(value):
+                values[metric['name']] = value
+
+        entry = {'country': country, 'exchange': self.exchange_of(ticker), 'values': values}
+        self.tickers[ticker] = entry
+        for name, value in values.items():
+            for key in self._group_keys(name, entry):
+                self.groups[key].add(value, ticker)
+
+    def remove(self, ticker: str):
+        entry = self.tickers.pop(ticker, None)
+        if entry is None:
+            return
+        for name, value in entry['values'].items():
+            for key in self._group_keys(name, entry):
+                self.groups[key].remove(value, ticker)
+
+    def percentile_rank(self, ticker: str, metric: str, scope: str = 'all') -> Optional[float]:
+        entry = self.tickers.get(ticker)
+        if entry is None or metric not in entry['values']:
+            return None
+        group = self.groups[self._scope_key(metric, scope, entry)]
+        return group.percentile(entry['values'][metric])
+
+    def top_n(self, metric: str, n: int = 10, country: Optional[str] = None,
+              exchange: Optional[str] = None, lowest: bool = False) -> List[Tuple[str, float]]:
+        if country:
+            key = (metric, 'country', country)
+        elif exchange:
+            key = (metric, 'exchange', exchange)
+        else:
+            key = (metric, 'all', None)
+        entries = self.groups[key].entries if key in self.groups else []
+        selected = entries[:n] if lowest else entries[:-n - 1:-1]
+        return [(ticker, value) for value, ticker in selected]
+
+    def peers(self, ticker: str, metric: str, scope: str = 'exchange', n: int = 5) -> List[Tuple[str, float]]:
+        """The ``n`` tickers in the same country/exchange whose value is closest."""
+        entry = self.tickers.get(ticker)
+        if entry is None or metric not in entry['values']:
+            return []
+        entries = self.groups[self._scope_key(metric, scope, entry)].entries
+        value = entry['values'][metric]
+        i = bisect_left(entries, (value, ticker))
+        lo, hi = i - 1, i + 1
+        found = []
+        while len(found) < n and (lo >= 0 or hi < len(entries)):
+            take_low = hi >= len(entries) or (lo >= 0 and value - entries[lo][0] <= entries[hi][0] - value)
+            if take_low:
+                found.append(entries[lo])
+                lo -= 1
+            else:
+                found.append(entries[hi])
+                hi += 1
+        return [(peer, peer_value) for peer_value, peer in found]
+
+    def country_aggregates(self, metric: str) -> Dict[str, Dict[str, float]]:
+        return {key[2]: group.summary() for key, group in self.groups.items()
+                if key[0] == metric and key[1] == 'country' and group.entries}
+
+    def metrics(self) -> List[str]:
+        return sorted({key[0] for key, group in self.groups.items() if key[1] == 'all' and group.entries})
+
+    def values(self, metric: str) -> np.ndarray:
+        group = self.groups.get((metric, 'all', None))
+        if group is None:
+            return np.empty(0)
+        return np.fromiter((value for value, _ in group.entries), dtype=np.float64, count=len(group.entries))
+
+    @staticmethod
+    def exchange_of(ticker: str) -> str:
+        return get_routing().exchange(ticker)
+
+    def _scope_key(self, metric: str, scope: str, entry: Dict[str, Any]):
+        if scope not in self.SCOPES:
+            raise ValueError(f"scope must be one of {self.SCOPES}")
+        return (metric, scope, entry.get(scope) if scope != 'all' else None)
+
+    def _group_keys(self, metric: str, entry: Dict[str, Any]):
+        return [(metric, 'all', None), (metric, 'country', entry['country']),
+                (metric, 'exchange', entry['exchange'])]
@@ -1,14 +1,226 @@
-import pandas as pd
+import csv
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
 from rich.console import Console
 
+from core.instrumentation import metrics
+
+EXPORT_FIELDS = ['country', 'ticker', 'company', 'metric', 'value', 'source', 'updated', 'error']
+
+Result = Tuple[str, str, Dict[str, Any]]
+
+def flatten_result(country: str, ticker: str, data: Dict[str, Any]) -> Iterator[List[Any]]:
+    """One row per metric (or a single error row) in EXPORT_FIELDS order.
+
+    Numeric values and dates stay ints or floats; every other field is a str or None.
+    """
+    company = _text(data.get('company', ''))
+    if 'error' in data:
+        yield [country, ticker, company, None, None, None, None, str(data['error'])]
+    for metric in data.get('metrics', []):
+        if not metric:
+            continue
+        yield [country, ticker, company, _text(metric.get('name')), _cell(metric.get('value')),
+               _text(metric.get('source')), _cell(metric.get('updated')), None]
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+def _cell(value: Any) -> Any:
+    # Plugins return dates and scores as ints, floats or strings; anything else is exported as text
+    return value if value is None or _is_number(value) else str(value)
+
+class _CSVSink:
+    """Appends in place (cut back on abort); a new file is written beside the target and moved over it."""
+
+    def __init__(self, path: Path, append: bool):
+        exists = append and path.exists() and path.stat().st_size > 0
+        self.path = path
+        self.tmp_path = None if exists else path.with_name(path.name + '.partial')
+        self.original_size = path.stat().st_size if exists else 0
+        self.file = open(path if exists else self.tmp_path, 'a' if exists else 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        if not exists:
+            self.writer.writerow(EXPORT_FIELDS)
+
+    def write(self, rows: List[List[Any]]):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        if self.tmp_path is not None:
+            os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        if self.tmp_path is not None:
+            self.tmp_path.unlink(missing_ok=True)
+        else:
+            with open(self.path, 'r+b') as f:
+                f.truncate(self.original_size)
+
+class _XLSXSink:
+    """Rows are spooled to a JSON-lines temp file and streamed into an openpyxl
+    write-only workbook on close, so an aborted export only drops the temp file.
+
+    Appending copies the existing sheet row by row through a read-only workbook,
+    since xlsx files cannot be extended in place.
+    """
+
+    def __init__(self, path: Path, append: bool):
+        import openpyxl  # noqa: F401 - fail before any rows are fetched
+        self.path = path
+        self.append = append
+        self.tmp_path = path.with_name(path.name + '.partial')
+        self.spool = tempfile.TemporaryFile('w+', encoding='utf-8', suffix='.jsonl')
+
+    def write(self, rows: List[List[Any]]):
+        for row in rows:
+            self.spool.write(json.dumps(row) + '\n')
+
+    def close(self):
+        from openpyxl import Workbook, load_workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('ESG')
+        if self.append and self.path.exists():
+            existing = load_workbook(self.path, read_only=True)
+            for row in existing.active.iter_rows(values_only=True):
+                sheet.append(row)
+            existing.close()
+        else:
+            sheet.append(EXPORT_FIELDS)
+
+        self.spool.seek(0)
+        for line in self.spool:
+            sheet.append(json.loads(line))
+        self.spool.close()
+        try:
+            workbook.save(self.tmp_path)
+        except BaseException:
+            self.tmp_path.unlink(missing_ok=True)
+            raise
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.spool.close()
+
+class _ParquetSink:
+    """One Parquet row group per flushed chunk.
+
+    Parquet columns have a single type, so numeric values go to the float64 ``value``
+    column and text ratings to ``value_text``.
+    """
+
+    def __init__(self, path: Path, append: bool):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from e
+        self.pa = pa
+        self.path = path
+        self.tmp_path = path.with_name(path.name + '.partial')
+        self.fields = EXPORT_FIELDS[:5] + ['value_text'] + EXPORT_FIELDS[5:]
+        self.schema = pa.schema([(field, pa.float64() if field == 'value' else pa.string())
+                                 for field in self.fields])
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema, compression='zstd')
+
+        if append and path.exists():
+            # Files written before value_text existed hold every value as a string
+            for batch in pq.ParquetFile(path).iter_batches():
+                self.write([[_text_or_value(row, field) for field in EXPORT_FIELDS]
+                            for row in batch.to_pylist()])
+
+    def write(self, rows: List[List[Any]]):
+        columns = {field: [] for field in self.fields}
+        for row in rows:
+            for field, value in zip(EXPORT_FIELDS, row):
+                if field == 'value':
+                    columns['value'].append(value if _is_number(value) else None)
+                    columns['value_text'].append(None if value is None or _is_number(value) else value)
+                else:
+                    columns[field].append(_text(value))
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.writer.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+def _text_or_value(row: Dict[str, Any], field: str) -> Any:
+    if field == 'value' and row.get('value') is None:
+        return row.get('value_text')
+    return row.get(field)
+
+SINKS = {'.csv': _CSVSink, '.xlsx': _XLSXSink, '.parquet': _ParquetSink}
+
 class DataExporter:
     def __init__(self):
         self.console = Console()
 
-    def to_excel(self, data: dict, filename: str):
+    def to_excel(self, data, filename: str):
+        import pandas as pd
         try:
-            df = pd.DataFrame(data['metrics'])
-            df.to_excel(filename, index=False)
+            if hasattr(data, 'to_pandas'):
+                df = data.to_pandas()
+            else:
+                df = pd.DataFrame(data['metrics'])
+            with metrics.stage('export', format='xlsx'):
+                df.to_excel(filename, index=False)
             self.console.print(f"[green]Successfully exported to {filename}[/]")
         except Exception as e:
-            self.console.print(f"[red]Export failed: {str(e)}[/]")
\ No newline at end of file
+            self.console.print(f"[red]Export failed: {str(e)}[/]")
+
+    def stream(self, results: Iterable[Result], filename: str, fmt: Optional[str] = None,
+               append: bool = False, chunk_size: int = 1000) -> int:
+        """Export ``(country, ticker, data)`` results as they arrive.
+
+        The format follows ``fmt`` or the file extension (csv, xlsx, parquet). Rows are
+        flushed every ``chunk_size`` rows, so memory stays bounded for any number of
+        results. Returns the number of rows written.
+        """
+        path = Path(filename)
+        suffix = f".{fmt.lstrip('.')}" if fmt else path.suffix.lower()
+        if suffix not in SINKS:
+            raise ValueError(f"Unsupported export format: {suffix or filename}")
+
+        fmt = suffix.lstrip('.')
+        sink = SINKS[suffix](path, append)
+        written = 0
+        chunk = []
+
+        def flush():
+            # Only the sink is timed; ``results`` may still be fetching
+            with metrics.stage('export', format=fmt):
+                sink.write(chunk)
+            metrics.inc('esg_export_rows_total', len(chunk), format=fmt)
+            return len(chunk)
+
+        try:
+            for country, ticker, data in results:
+                chunk.extend(flatten_result(country, ticker, data))
+                if len(chunk) >= chunk_size:
+                    written += flush()
+                    chunk = []
+            if chunk:
+                written += flush()
+        except BaseException:
+            # Leave whatever was at ``filename`` untouched
+            sink.abort()
+            raise
+        with metrics.stage('export', format=fmt):
+            sink.close()
+
+        self.console.print(f"[green]Streamed {written} rows to {filename}[/]")
+        return written
@@ -1,33 +1,408 @@
+import asyncio
+import contextvars
 import importlib
+import os
+import threading
 import yaml
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+from core.batching import MicroBatcher, NotInBatch
+from core.cache import ResultCache
+from core.instrumentation import metrics
+from core.plugin_api import ModulePlugin
+from core.routing import get_routing
+from core.singleflight import SingleFlight
+from core.transport import HTTPTransport, get_transport
+
+if TYPE_CHECKING:
+    # Both pull in numpy, which is too heavy to load at startup
+    from core.history import HistoryStore
+    from core.metrics_store import MetricFrame
 
 class ESGEngine:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResultCache] = None,
+                 transport: Optional[HTTPTransport] = None,
+                 history: Optional['HistoryStore'] = None, blocking_workers: int = 64,
+                 batch_window: float = 0.005, lock_dir: Optional[str] = None,
+                 fallback_per_host: int = 2):
         self.countries = self._load_config('config/countries.yaml')
         self.sources = self._load_config('config/sources.yaml')
-        self.plugins = self._load_plugins()
+        self.plugins = {}
+        self._async_plugins = {}
+        self.blocking_workers = blocking_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.batch_window = batch_window
+        self._batchers: Dict[str, MicroBatcher] = {}
+        # Tickers a batch call leaves out are fetched singly, at most this many per host at once
+        self.fallback_per_host = fallback_per_host
+        self._fallback_slots: Dict[str, threading.BoundedSemaphore] = {}
+        # Concurrent requests for one (country, ticker, source) share a fetch; with a
+        # lock directory (ESG_LOCK_DIR) so do engines in other processes
+        self._flight = SingleFlight(lock_dir or os.getenv('ESG_LOCK_DIR'), name='engine')
+        self._unavailable = set()
+        self.cache = cache or ResultCache(**self.sources.get('cache', {}))
+        self.transport = transport or get_transport()
+        self.routing = get_routing()
+        # The configured store is opened on first use; pass one (or set None) to override
+        self._history = history
+        self._history_pending = history is None and 'history' in self.sources
+        self._history_lock = threading.Lock()
+        self.source_ttls = {
+            source['name']: source['ttl']
+            for tier in self.sources['sources'].values()
+            for source in tier if 'ttl' in source
+        }
+
+    @property
+    def history(self) -> Optional['HistoryStore']:
+        if self._history_pending:
+            with self._history_lock:
+                if self._history_pending:
+                    from core.history import HistoryStore
+                    self._history = HistoryStore(**self.sources['history'])
+                    self._history_pending = False
+        return self._history
+
+    @history.setter
+    def history(self, store: Optional['HistoryStore']):
+        self._history = store
+        self._history_pending = False
 
     def _load_config(self, path: str) -> Dict:
         with open(path) as f:
             return yaml.safe_load(f)
 
-    def _load_plugins(self) -> Dict:
-        plugins = {}
-        for country_code in self.countries['countries']:
-            try:
-                module = importlib.import_module(f"plugins.{country_code}")
-                plugins[country_code] = module
-            except ImportError:
-                continue
-        return plugins
-
-    def get_esg_data(self, country: str, ticker: str) -> Dict[str, Any]:
-        if country not in self.plugins:
-            return self._fallback_data(ticker)
-        return self.plugins[country].get_esg_data(ticker)
+    def _plugin(self, country: str):
+        """Import a country's plugin on first use; None if it has no usable plugin."""
+        if country in self.plugins:
+            return self.plugins[country]
+        if country in self._unavailable or country not in self.countries['countries']:
+            return None
+        name = self.countries['countries'][country].get('plugin', country)
+        try:
+            self.plugins[country] = importlib.import_module(f"plugins.{name}")
+        except ImportError:
+            self._unavailable.add(country)
+            return None
+        return self.plugins[country]
+
+    def plugin(self, country: str) -> Optional[ModulePlugin]:
+        """The country's plugin behind the async protocol; None if it has no usable plugin."""
+        module = self._plugin(country)
+        if module is None:
+            return None
+        plugin = self._async_plugins.get(country)
+        if plugin is None or plugin.module is not module:
+            plugin = self._async_plugins[country] = ModulePlugin(module, self.executor)
+        return plugin
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Threads that run blocking plugins for the async API."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.blocking_workers,
+                                                thread_name_prefix='esg-plugin')
+        return self._executor
+
+    def resolve(self, country: Optional[str], ticker: str) -> Tuple[str, str]:
+        """Fill in the country of a bare ticker from its suffix (``7203.T`` -> JP)."""
+        if country:
+            return country, ticker
+        return self.routing.route(ticker).country or '', ticker
+
+    def resolve_many(self, pairs: Iterable[Tuple[Optional[str], str]]) -> List[Tuple[str, str]]:
+        """``resolve`` for a whole list, classifying the bare tickers in one pass."""
+        pairs = list(pairs)
+        bare = [i for i, (country, _) in enumerate(pairs) if not country]
+        if bare:
+            countries = self.routing.classify([pairs[i][1] for i in bare])['country']
+            for i, country in zip(bare, countries):
+                pairs[i] = (country or '', pairs[i][1])
+        return pairs
+
+    def get_esg_data(self, country: Optional[str], ticker: str, batch: bool = False) -> Dict[str, Any]:
+        """ESG data for ``ticker``; with no ``country`` it is routed by its suffix.
+
+        With ``batch`` a miss joins the source's current micro-batch when it has one
+        (see ``_batcher``); bulk callers set it, single lookups go straight out.
+        """
+        country, symbol = self._symbol(country, ticker)
+        source = self._source_name(country)
+        key = (country, symbol, source)
+        return self.cache.get_or_fetch(
+            key,
+            lambda: self._flight.do(key, lambda: self._fetch(country, symbol, batch),
+                                    recheck=lambda: self._fresh(key)),
+            ttl=self.source_ttls.get(source)
+        )
+
+    def refresh(self, country: Optional[str], ticker: str, batch: bool = False) -> Dict[str, Any]:
+        """Fetch bypassing the cache, then store the new result."""
+        country, symbol = self._symbol(country, ticker)
+        source = self._source_name(country)
+        key = (country, symbol, source)
+        data = self._flight.do(key, lambda: self._fetch(country, symbol, batch))
+        if data and 'error' not in data:
+            self.cache.set(key, data, self.source_ttls.get(source))
+        return data
+
+    def source_ttl(self, country: str) -> int:
+        return self.source_ttls.get(self._source_name(country), self.cache.default_ttl)
+
+    def _fetch(self, country: str, ticker: str, batch: bool = False) -> Dict[str, Any]:
+        source = self._source_name(country)
+        metrics.take_fallback()
+        outcome = 'error'
+        try:
+            with metrics.stage('fetch', source=source, country=country):
+                data, fell_back = self._fetch_plugin(country, ticker, batch)
+            outcome = self._observe(country, ticker, data, fell_back)
+            return data
+        finally:
+            metrics.inc('esg_fetch_total', source=source, country=country, outcome=outcome)
+
+    async def _afetch(self, country: str, ticker: str, batch: bool = False) -> Dict[str, Any]:
+        source = self._source_name(country)
+        metrics.take_fallback()
+        outcome = 'error'
+        try:
+            with metrics.stage('fetch', source=source, country=country):
+                data, fell_back = await self._afetch_plugin(country, ticker, batch)
+            outcome = self._observe(country, ticker, data, fell_back)
+            return data
+        finally:
+            metrics.inc('esg_fetch_total', source=source, country=country, outcome=outcome)
+
+    def _observe(self, country: str, ticker: str, data: Dict[str, Any], fell_back: bool) -> str:
+        """Record a fetched result in the history; returns the fetch outcome label."""
+        if not data or 'error' in data:
+            return 'error'
+        if self.history is not None:
+            self.history.append(country, ticker, data)
+        return 'fallback' if fell_back or metrics.take_fallback() else 'success'
+
+    def _fetch_plugin(self, country: str, ticker: str, batch: bool = False) -> Tuple[Dict[str, Any], bool]:
+        """Plugin result plus whether the engine had to use the generic source instead."""
+        plugin = self._plugin(country)
+        if plugin is None:
+            return self._fallback_data(ticker), False
+        try:
+            batcher = self._batcher(country) if batch else None
+            if batcher is not None:
+                try:
+                    return batcher.get(ticker), False
+                except NotInBatch:
+                    return self._fetch_single(country, ticker), False
+            return plugin.get_esg_data(ticker, transport=self.transport), False
+        except ImportError:
+            # Heavy dependencies are imported on first call; a missing one means no plugin
+            self.plugins.pop(country, None)
+            self._unavailable.add(country)
+            return self._fallback_data(ticker), True
+
+    async def _afetch_plugin(self, country: str, ticker: str, batch: bool = False) -> Tuple[Dict[str, Any], bool]:
+        plugin = self.plugin(country)
+        if plugin is None:
+            return await self._generic().fetch(ticker, self.transport), False
+        try:
+            batcher = self._batcher(country) if batch else None
+            if batcher is not None:
+                try:
+                    return await asyncio.wrap_future(batcher.submit(ticker)), False
+                except NotInBatch:
+                    context = contextvars.copy_context()
+                    return await asyncio.get_running_loop().run_in_executor(
+                        self.executor, partial(context.run, self._fetch_single, country, ticker)), False
+            return await plugin.fetch(ticker, self.transport), False
+        except ImportError:
+            self.plugins.pop(country, None)
+            self._async_plugins.pop(country, None)
+            self._unavailable.add(country)
+            return await self._generic().fetch(ticker, self.transport), True
+
+    async def aget_esg_data(self, country: Optional[str], ticker: str, refresh: bool = False,
+                            batch: bool = False) -> Dict[str, Any]:
+        """Async ``get_esg_data`` (or ``refresh``) that awaits the plugin instead of blocking a thread."""
+        country, symbol = self._symbol(country, ticker)
+        source = self._source_name(country)
+        key, ttl = (country, symbol, source), self.source_ttls.get(source)
+        if not refresh:
+            revalidate = lambda: self._flight.do(key, lambda: self._fetch(country, symbol))
+            cached = self.cache.lookup(key, revalidate, ttl)
+            if cached is not None:
+                return cached
+        data = await self._flight.ado(key, lambda: self._afetch(country, symbol, batch),
+                                      recheck=None if refresh else lambda: self._fresh(key))
+        if data and 'error' not in data:
+            self.cache.set(key, data, ttl)
+        return data
+
+    async def aget_esg_data_many(self, pairs: Iterable[Tuple[str, str]], max_concurrency: int = 1000,
+                                 per_host: int = 8, refresh: bool = False,
+                                 timeout: Optional[float] = None) -> AsyncIterator[Tuple[str, str, Dict[str, Any]]]:
+        """Async ``get_esg_data_many``: up to ``max_concurrency`` fetches in flight on one event loop.
+
+        ``per_host`` bounds each source's share (and browser plugins never exceed
+        the browser pool). A fetch that takes longer than ``timeout`` seconds yields
+        an error and frees its slot, even if a blocking plugin is still running.
+        """
+        host_slots: Dict[str, asyncio.Semaphore] = {}
+
+        async def one(country: str, ticker: str) -> Tuple[str, str, Dict[str, Any]]:
+            key = self._host_key(country)
+            if key not in host_slots:
+                host_slots[key] = asyncio.Semaphore(self._host_limit(country, per_host))
+            async with host_slots[key]:
+                try:
+                    data = await asyncio.wait_for(self.aget_esg_data(country, ticker, refresh, batch=True),
+                                                  timeout)
+                except asyncio.TimeoutError:
+                    data = {'error': f'Timed out after {timeout}s'}
+                except Exception as e:
+                    data = {'error': str(e)}
+            return country, ticker, data or {'error': 'Data unavailable'}
+
+        pending = set()
+        for country, ticker in pairs:
+            if len(pending) >= max_concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.ensure_future(one(*self.resolve(country, ticker))))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+    def get_esg_data_many(self, pairs: Iterable[Tuple[str, str]], max_concurrency: int = 8,
+                          per_host: int = 2, refresh: bool = False) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Fetch (country, ticker) pairs concurrently, yielding results as they finish.
+
+        At most ``per_host`` requests run against the same exchange at once. Pairs are
+        pulled from ``pairs`` lazily, so generators of any length are fine. A failing
+        ticker yields ``{'error': ...}`` instead of stopping the batch. ``refresh`` bypasses
+        the cache. Pairs with an empty country are routed by ticker suffix, and are
+        yielded with the country they were routed to.
+        """
+        pairs = (self.resolve(country, ticker) for country, ticker in pairs)
+        deferred = deque()
+        host_load = defaultdict(int)
+        in_flight = {}
+
+        def next_ready():
+            for _ in range(len(deferred)):
+                pair = deferred.popleft()
+                if host_load[self._host_key(pair[0])] < self._host_limit(pair[0], per_host):
+                    return pair
+                deferred.append(pair)
+            while len(deferred) < max_concurrency * 4:
+                pair = next(pairs, None)
+                if pair is None:
+                    return None
+                if host_load[self._host_key(pair[0])] < self._host_limit(pair[0], per_host):
+                    return pair
+                deferred.append(pair)
+            return None
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            while True:
+                while len(in_flight) < max_concurrency:
+                    pair = next_ready()
+                    if pair is None:
+                        break
+                    host_load[self._host_key(pair[0])] += 1
+                    in_flight[pool.submit(self._safe_fetch, *pair, refresh)] = pair
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    country, ticker = in_flight.pop(future)
+                    host_load[self._host_key(country)] -= 1
+                    yield country, ticker, future.result()
+
+    def collect(self, pairs: Iterable[Tuple[str, str]], frame: Optional['MetricFrame'] = None,
+                **kwargs) -> 'MetricFrame':
+        """Fetch pairs concurrently straight into a columnar MetricFrame."""
+        from core.metrics_store import MetricFrame
+        frame = frame if frame is not None else MetricFrame()
+        return frame.extend(self.get_esg_data_many(pairs, **kwargs))
+
+    def _safe_fetch(self, country: str, ticker: str, refresh: bool = False) -> Dict[str, Any]:
+        fetch = self.refresh if refresh else self.get_esg_data
+        try:
+            return fetch(country, ticker, batch=True) or {'error': 'Data unavailable'}
+        except Exception as e:
+            return {'error': str(e)}
+
+    def _fresh(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        # Another process may have just stored it, so skip the in-memory copy
+        payload, fresh = self.cache.reload(key)
+        return payload if fresh else None
+
+    def _symbol(self, country: Optional[str], ticker: str) -> Tuple[str, str]:
+        # Plugins take local codes, so a suffix belonging to the country is dropped
+        country, ticker = self.resolve(country, ticker)
+        return country, self.routing.symbol(ticker, country)
+
+    def _host_key(self, country: str) -> str:
+        # Plugins each talk to their own exchange; everything else shares the fallback API
+        plugin = self.plugin(country)
+        if plugin is None:
+            return 'generic'
+        return plugin.capabilities.hosts[0] if plugin.capabilities.hosts else country
+
+    def _host_limit(self, country: str, per_host: int) -> int:
+        plugin = self.plugin(country)
+        if plugin is None:
+            return per_host
+        if plugin.capabilities.needs_browser:
+            from plugins._browser import get_pool
+            return max(1, min(per_host, get_pool().size))
+        if self._batcher(country) is not None:
+            # Waiting callers share one request per batch window, so they need not be held
+            # back; the ones a batch leaves out wait on ``fallback_per_host`` instead
+            return max(per_host, plugin.capabilities.max_batch)
+        return per_host
+
+    def _batcher(self, country: str) -> Optional[MicroBatcher]:
+        """Micro-batcher for plugins with a blocking ``get_esg_data_batch``; None otherwise."""
+        batcher = self._batchers.get(country)
+        if batcher is not None:
+            return batcher
+        plugin = self.plugin(country)
+        if plugin is None or not hasattr(plugin.module, 'get_esg_data_batch'):
+            return None
+        batcher = MicroBatcher(partial(plugin.module.get_esg_data_batch, transport=self.transport),
+                               window=self.batch_window, max_batch=plugin.capabilities.max_batch,
+                               source=plugin.source, executor=self.executor)
+        return self._batchers.setdefault(country, batcher)
+
+    def _fetch_single(self, country: str, ticker: str) -> Dict[str, Any]:
+        """Fetch a ticker its source's batch call left out, within ``fallback_per_host``."""
+        host = self._host_key(country)
+        slots = self._fallback_slots.get(host)
+        if slots is None:
+            slots = self._fallback_slots.setdefault(host, threading.BoundedSemaphore(self.fallback_per_host))
+        with slots:
+            return self._plugin(country).get_esg_data(ticker, transport=self.transport)
+
+    def _source_name(self, country: str) -> str:
+        plugin = self._plugin(country)
+        if plugin is not None:
+            return getattr(plugin, 'SOURCE', country)
+        return 'Alpha Vantage'
 
     def _fallback_data(self, ticker: str) -> Dict:
         from plugins.generic import get_esg_data
-        return get_esg_data(ticker)
\ No newline at end of file
+        return get_esg_data(ticker, transport=self.transport)
+
+    def _generic(self) -> ModulePlugin:
+        if 'generic' not in self._async_plugins:
+            self._async_plugins['generic'] = ModulePlugin(importlib.import_module('plugins.generic'),
+                                                          self.executor)
+        return self._async_plugins['generic']
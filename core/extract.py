@@ -0,0 +1,279 @@
+from html.parser import HTMLParser as _StdHTMLParser
+from typing import Collection, Dict, List, Mapping, Optional, Tuple, Union
+
+try:
+    from lxml import etree as _etree
+except ImportError:
+    _etree = None
+
+# Parser BeautifulSoup should use when a full tree is really needed
+SOUP_PARSER = 'lxml' if _etree is not None else 'html.parser'
+
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                       'link', 'meta', 'param', 'source', 'track', 'wbr'))
+
+# Open elements a new start tag closes implicitly, for the stdlib backend
+IMPLIED_END = {
+    'td': ('td', 'th'), 'th': ('td', 'th'), 'tr': ('td', 'th', 'tr'),
+    'li': ('li',), 'p': ('p',), 'option': ('option',),
+}
+IMPLIED_END.update(dict.fromkeys(('div', 'ul', 'ol', 'table', 'section', 'h1', 'h2', 'h3',
+                                  'h4', 'h5', 'h6', 'pre', 'form'), ('p',)))
+
+class Field:
+    """Declarative selector for one value on a page.
+
+    Matches the first ``tag`` element carrying class ``cls`` and ``attrs``,
+    optionally only ``inside`` an element matched by another Field. With
+    ``label`` the value is instead the ``tag`` element that follows the one
+    whose text is ``label`` (e.g. the cell after a "Total Score" cell).
+    """
+
+    __slots__ = ('tag', 'cls', 'attrs', 'inside', 'label')
+
+    def __init__(self, tag: str, cls: Optional[str] = None, attrs: Optional[Dict[str, str]] = None,
+                 inside: Optional['Field'] = None, label: Optional[str] = None):
+        self.tag = tag
+        self.cls = cls
+        self.attrs = attrs or {}
+        self.inside = inside
+        self.label = label
+
+    def matches(self, tag: str, attrs: Mapping[str, str]) -> bool:
+        if tag != self.tag:
+            return False
+        if self.cls is not None and self.cls not in (attrs.get('class') or '').split():
+            return False
+        return all(attrs.get(name) == value for name, value in self.attrs.items())
+
+Fields = Mapping[str, Field]
+
+class _Matcher:
+    """Resolves Fields from a stream of start/end events, for either backend."""
+
+    def __init__(self, fields: Fields):
+        self.pending = dict(fields)
+        self.found: Dict[str, Optional[str]] = dict.fromkeys(fields)
+        self.armed = set()
+        self.stack: List[Tuple[str, Mapping[str, str]]] = []
+
+    @property
+    def done(self) -> bool:
+        return not self.pending
+
+    def start(self, tag: str, attrs: Mapping[str, str]):
+        self.stack.append((tag, attrs))
+
+    def end(self, tag: str, text_of):
+        """Close the innermost ``tag``; ``text_of()`` returns the element's text."""
+        tag_attrs = _pop(self.stack, tag)
+        if tag_attrs is None:
+            return
+
+        text = None
+        for name, field in list(self.pending.items()):
+            if not field.matches(tag, tag_attrs) or not self._inside(field):
+                continue
+            if text is None:
+                text = ' '.join(text_of().split())
+            if field.label is None or name in self.armed:
+                self.found[name] = text
+                del self.pending[name]
+            elif text == field.label:
+                self.armed.add(name)
+
+    def _inside(self, field: Field) -> bool:
+        if field.inside is None:
+            return True
+        return any(field.inside.matches(tag, attrs) for tag, attrs in self.stack)
+
+class _RowMatcher:
+    """Collects ``cells`` from every ``row`` element, keyed by the row's ``key`` attribute."""
+
+    def __init__(self, row: Field, key: str, cells: Fields, keys: Optional[Collection[str]] = None):
+        self.row = row
+        self.key = key
+        self.cells = dict(cells)
+        self.remaining = None if keys is None else set(keys)
+        self.rows: Dict[str, Dict[str, Optional[str]]] = {}
+        self.stack: List[Tuple[str, Mapping[str, str]]] = []
+        self.current: Optional[Tuple[str, Dict[str, Optional[str]], int]] = None
+
+    @property
+    def done(self) -> bool:
+        return self.remaining is not None and not self.remaining
+
+    def start(self, tag: str, attrs: Mapping[str, str]):
+        self.stack.append((tag, attrs))
+        if self.current is None and self.row.matches(tag, attrs):
+            key = attrs.get(self.key)
+            if key and (self.remaining is None or key in self.remaining):
+                self.current = (key, dict.fromkeys(self.cells), len(self.stack))
+
+    def end(self, tag: str, text_of):
+        tag_attrs = _pop(self.stack, tag)
+        if tag_attrs is None or self.current is None:
+            return
+        key, values, depth = self.current
+        if len(self.stack) < depth:
+            # The row itself (or an element around it) just closed
+            self.rows[key] = values
+            if self.remaining is not None:
+                self.remaining.discard(key)
+            self.current = None
+            return
+        for name, cell in self.cells.items():
+            if values[name] is None and cell.matches(tag, tag_attrs):
+                values[name] = ' '.join(text_of().split())
+
+def _pop(stack: List[Tuple[str, Mapping[str, str]]], tag: str) -> Optional[Mapping[str, str]]:
+    """Pop up to and including the innermost open ``tag``; its attrs, or None if it was not open."""
+    while stack:
+        open_tag, attrs = stack.pop()
+        if open_tag == tag:
+            return attrs
+    return None
+
+class _StdlibBackend(_StdHTMLParser):
+    def __init__(self, matcher):
+        super().__init__(convert_charrefs=True)
+        self.matcher = matcher
+        self.parts: List[str] = []
+        self.starts: List[int] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        implied = IMPLIED_END.get(tag, ())
+        while self.matcher.stack and self.matcher.stack[-1][0] in implied:
+            self._close_top()
+        self.matcher.start(tag, dict(attrs))
+        self.starts.append(len(self.parts))
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _ in self.matcher.stack):
+            return
+        # Anything still open inside ``tag`` was left unclosed in the markup
+        while self._close_top() != tag:
+            pass
+
+    def handle_data(self, data):
+        if self.starts:
+            self.parts.append(data)
+
+    def feed_chunk(self, chunk: str):
+        self.feed(chunk)
+
+    def close(self):
+        super().close()
+        while self.matcher.stack:
+            self._close_top()
+
+    def _close_top(self) -> str:
+        tag = self.matcher.stack[-1][0]
+        start = self.starts.pop()
+        self.matcher.end(tag, lambda: ''.join(self.parts[start:]))
+        if not self.starts:
+            self.parts.clear()
+        return tag
+
+class _LxmlBackend:
+    """HTMLPullParser events fed to the matcher, pruning the tree as it goes.
+
+    lxml builds elements as it parses, so each closed element's text is kept
+    as a string for its parent and the element itself is dropped once its
+    tail has been read; only the open elements and their newest children
+    stay in memory.
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.parser = _etree.HTMLPullParser(events=('start', 'end'))
+        # Open elements with the text gathered for each so far, outermost first
+        self.open: List[Tuple[object, List[str]]] = []
+
+    def feed_chunk(self, chunk: str):
+        self.parser.feed(chunk)
+        self._drain()
+
+    def close(self):
+        try:
+            self.parser.close()
+        except _etree.XMLSyntaxError:
+            return  # nothing parseable at all
+        self._drain()
+
+    def _drain(self):
+        matcher, open_ = self.matcher, self.open
+        for event, element in self.parser.read_events():
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue  # comments and processing instructions
+            if event == 'start':
+                if open_:
+                    parent, parts = open_[-1]
+                    _consume(parent, parts, element)
+                open_.append((element, []))
+                matcher.start(tag, element.attrib)
+            else:
+                parts = open_.pop()[1] if open_ else []
+                _consume(element, parts, None)
+                text = ''.join(parts)
+                matcher.end(tag, lambda: text)
+                if open_:
+                    open_[-1][1].append(text)
+
+def _consume(parent, parts: List[str], upto):
+    """Add ``parent``'s text and its closed children's tails to ``parts``, dropping those children."""
+    if not parts:
+        # Complete only now: the first child has started or the element has ended
+        parts.append(parent.text or '')
+    for child in parent:
+        if child is upto:
+            break
+        parts.append(child.tail or '')
+        parent.remove(child)
+
+def require(values: Mapping[str, Optional[str]], name: str) -> str:
+    """``values[name]``, raising ValueError when the page did not have it."""
+    value = values.get(name)
+    if value is None:
+        raise ValueError(f"{name} not found on page")
+    return value
+
+def extract(html: Union[str, bytes], fields: Fields, chunk_size: int = 16384,
+            backend: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """Pull ``fields`` out of ``html`` without building a document tree.
+
+    The page is parsed in ``chunk_size`` pieces and parsing stops as soon as every
+    field has been found, so values near the top of a large page cost only the
+    bytes before them. Missing fields come back as None. ``backend`` is 'lxml' or
+    'stdlib'; by default lxml is used when it is installed.
+    """
+    return _run(html, _Matcher(fields), chunk_size, backend).found
+
+def extract_rows(html: Union[str, bytes], row: Field, key: str, cells: Fields,
+                 keys: Optional[Collection[str]] = None, chunk_size: int = 16384,
+                 backend: Optional[str] = None) -> Dict[str, Dict[str, Optional[str]]]:
+    """``cells`` of each ``row`` element on a listing page, keyed by the row's ``key`` attribute.
+
+    With ``keys`` only those rows are collected and parsing stops once all of
+    them have been seen; rows that are not on the page are simply absent.
+    """
+    return _run(html, _RowMatcher(row, key, cells, keys), chunk_size, backend).rows
+
+def _run(html: Union[str, bytes], matcher, chunk_size: int, backend: Optional[str]):
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    use_lxml = backend == 'lxml' or (backend is None and _etree is not None)
+    parser = _LxmlBackend(matcher) if use_lxml else _StdlibBackend(matcher)
+    for offset in range(0, len(html), chunk_size):
+        parser.feed_chunk(html[offset:offset + chunk_size])
+        if matcher.done:
+            break
+    else:
+        parser.close()
+    return matcher
@@ -0,0 +1,339 @@
+import datetime
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: one writing process per store
+    fcntl = None
+
+from core.metrics_store import Dictionary, parse_date, parse_value
+
+# Column name -> on-disk dtype. Strings are codes into the store's dictionary.
+COLUMNS = {
+    'ticker': '<i4',
+    'metric': '<i4',
+    'source': '<i4',
+    'observed': '<i4',   # seconds since the start of the partition's month
+    'value': '<f8',
+    'text': '<i4',       # non-numeric value, -1 when the value is numeric
+    'updated': '<i4',    # source's own date, days since epoch
+}
+NO_DATE = np.iinfo(np.int32).min
+
+Instant = Union[str, float, np.datetime64, datetime.date]
+
+def _instant(value: Instant, end: bool = False) -> np.datetime64:
+    """Seconds-resolution instant; a date (or month) as ``end`` covers the whole period."""
+    if isinstance(value, (int, float, np.number)):
+        return np.datetime64(int(value), 's')
+    instant = np.datetime64(value)
+    unit = np.datetime_data(instant.dtype)[0]
+    if end and unit in ('Y', 'M', 'W', 'D'):
+        return (instant + np.timedelta64(1, unit)).astype('datetime64[s]') - np.timedelta64(1, 's')
+    return instant.astype('datetime64[s]')
+
+class _Partition:
+    """One ``date=YYYY-MM/country=XX`` directory of append-only column files."""
+
+    def __init__(self, path: Path, month: np.datetime64, country: str):
+        self.path = path
+        self.month = month
+        self.country = country
+        self.base = month.astype('datetime64[s]')
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Read-only memory maps of every column, trimmed to the rows all of them have."""
+        sizes = {}
+        for name, dtype in COLUMNS.items():
+            file = self.path / f'{name}.bin'
+            sizes[name] = file.stat().st_size // np.dtype(dtype).itemsize if file.exists() else 0
+        # A crash mid-append can leave some columns a row ahead of the others
+        rows = min(sizes.values())
+        if rows == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        return {name: np.memmap(self.path / f'{name}.bin', dtype=dtype, mode='r', shape=(rows,))
+                for name, dtype in COLUMNS.items()}
+
+    def append(self, rows: Dict[str, np.ndarray], repair: bool = True):
+        self.path.mkdir(parents=True, exist_ok=True)
+        if repair:
+            self._repair()
+        for name, dtype in COLUMNS.items():
+            with open(self.path / f'{name}.bin', 'ab') as f:
+                f.write(np.ascontiguousarray(rows[name], dtype=dtype).tobytes())
+
+    def _repair(self):
+        """Cut every column back to the rows all of them have, so new rows line up."""
+        files = {name: self.path / f'{name}.bin' for name in COLUMNS}
+        sizes = {name: file.stat().st_size if file.exists() else 0 for name, file in files.items()}
+        rows = min(sizes[name] // np.dtype(dtype).itemsize for name, dtype in COLUMNS.items())
+        for name, dtype in COLUMNS.items():
+            if sizes[name] > rows * np.dtype(dtype).itemsize:
+                with open(files[name], 'r+b') as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+
+class HistoryStore:
+    """Append-only time series of every ESG observation, for trends and as-of lookups.
+
+    Rows are (country, ticker, metric, source, observed, value) plus the source's
+    own ``updated`` date. They are partitioned into ``date=YYYY-MM/country=XX``
+    directories with one fixed-width binary file per column, and read back through
+    memory maps, so queries touch only the partitions and columns they need.
+    Strings are dictionary-encoded into an append-only ``strings.jsonl``. An
+    observation whose value matches the latest stored one for the same ticker,
+    metric and source is dropped, so re-fetching an unchanged ticker costs nothing.
+    Appends take an exclusive lock on the store, so several processes can share a root.
+    """
+
+    def __init__(self, root: str = '.esg_history'):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.strings = Dictionary()
+        self._strings_path = self.root / 'strings.jsonl'
+        self._strings_read = 0
+        self._lock = threading.RLock()
+        self._latest: Optional[Dict[Tuple[str, int, int, int], Tuple[float, int]]] = None
+        # Bumped in <root>/.lock before any process writes, so the others know to catch up
+        self._generation = -1
+        self._written = False
+        self._repaired = set()
+        self._lock_fd = os.open(self.root / '.lock', os.O_RDWR | os.O_CREAT)
+        self._load_strings()
+
+    def append(self, country: str, ticker: str, result: Dict[str, Any],
+               observed_at: Optional[float] = None) -> int:
+        """Record a plugin result; returns the number of rows that were new."""
+        if not result or 'error' in result:
+            return 0
+        observed = _instant(time.time() if observed_at is None else observed_at)
+        with self._lock, self._exclusive():
+            latest = self._latest_values()
+            # Applied to ``latest`` only once the rows are on disk
+            changed = {}
+            rows = []
+            for metric in result.get('metrics', []):
+                if not metric or not metric.get('name'):
+                    continue
+                raw = metric.get('value')
+                value = parse_value(raw)
+                text = str(raw) if math.isnan(value) and raw not in (None, '') else None
+                key = (country, self._encode(ticker), self._encode(metric['name']),
+                       self._encode(metric.get('source')))
+                state = (value, self._encode(text))
+                current = changed.get(key, latest.get(key))
+                if current is not None and _same(current, state):
+                    continue
+                changed[key] = state
+                updated = parse_date(metric.get('updated') or metric.get('lastUpdated'))
+                rows.append(key[1:] + state + (NO_DATE if np.isnat(updated) else int(updated.astype(np.int64)),))
+            if rows:
+                partition = self._partition(observed, country)
+                self._writing()
+                partition.append(self._columns(rows, observed), repair=partition.path not in self._repaired)
+                self._repaired.add(partition.path)
+                latest.update(changed)
+            return len(rows)
+
+    def range(self, tickers: Optional[Iterable[str]] = None, start: Optional[Instant] = None,
+              end: Optional[Instant] = None, metrics: Optional[Iterable[str]] = None,
+              countries: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Every stored observation in ``[start, end]``, as aligned column arrays.
+
+        Bounds are inclusive and a date-only ``end`` covers that whole day. Only
+        changes are stored, so this is the list of points where a value moved.
+        """
+        rows = self._scan(tickers, metrics, countries,
+                          None if start is None else _instant(start),
+                          None if end is None else _instant(end, end=True))
+        return self._decode(rows)
+
+    def as_of(self, when: Instant, tickers: Optional[Iterable[str]] = None,
+              metrics: Optional[Iterable[str]] = None,
+              countries: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """The value each ticker/metric/source had at ``when`` ('2025-12-31' means end of day)."""
+        rows = self._scan(tickers, metrics, countries, None, _instant(when, end=True))
+        return self._decode(self._last(rows))
+
+    def partitions(self) -> List[_Partition]:
+        found = []
+        for month_dir in sorted(self.root.glob('date=*')):
+            month = np.datetime64(month_dir.name.split('=', 1)[1], 'M')
+            for country_dir in sorted(month_dir.glob('country=*')):
+                found.append(_Partition(country_dir, month, country_dir.name.split('=', 1)[1]))
+        return found
+
+    @property
+    def nbytes(self) -> int:
+        return sum(file.stat().st_size for file in self.root.rglob('*.bin'))
+
+    def _partition(self, observed: np.datetime64, country: str) -> _Partition:
+        month = observed.astype('datetime64[M]')
+        return _Partition(self.root / f'date={month}' / f'country={country}', month, country)
+
+    def _columns(self, rows: List[Tuple], observed: np.datetime64) -> Dict[str, np.ndarray]:
+        offset = int((observed - observed.astype('datetime64[M]').astype('datetime64[s]')).astype(np.int64))
+        ticker, metric, source, value, text, updated = zip(*rows)
+        return {'ticker': ticker, 'metric': metric, 'source': source,
+                'observed': [offset] * len(rows), 'value': value, 'text': text, 'updated': updated}
+
+    def _scan(self, tickers, metrics, countries, start, end) -> Dict[str, np.ndarray]:
+        """Matching rows from every partition that can hold them, with country codes."""
+        with self._lock:
+            # Other processes may have added strings that their rows refer to
+            self._load_strings()
+        ticker_codes = self._codes(tickers)
+        metric_codes = self._codes(metrics)
+        countries = None if countries is None else set(countries)
+        first = None if start is None else start.astype('datetime64[M]')
+        last = None if end is None else end.astype('datetime64[M]')
+
+        parts, country_names = [], []
+        for partition in self.partitions():
+            if countries is not None and partition.country not in countries:
+                continue
+            if (first is not None and partition.month < first) or (last is not None and partition.month > last):
+                continue
+            columns = partition.columns()
+            observed = partition.base + columns['observed'].astype('timedelta64[s]')
+            mask = np.ones(len(observed), dtype=bool)
+            if ticker_codes is not None:
+                mask &= np.isin(columns['ticker'], ticker_codes)
+            if metric_codes is not None:
+                mask &= np.isin(columns['metric'], metric_codes)
+            if start is not None:
+                mask &= observed >= start
+            if end is not None:
+                mask &= observed <= end
+            if not mask.any():
+                continue
+            rows = {name: np.asarray(column[mask]) for name, column in columns.items()}
+            rows['observed'] = observed[mask]
+            rows['country'] = np.full(int(mask.sum()), len(country_names), dtype=np.int32)
+            country_names.append(partition.country)
+            parts.append(rows)
+
+        if not parts:
+            empty = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+            empty.update(observed=np.empty(0, dtype='datetime64[s]'), country=np.empty(0, dtype=np.int32))
+            parts = [empty]
+        merged = {name: np.concatenate([rows[name] for rows in parts]) for name in parts[0]}
+        merged['country_names'] = np.array(country_names + [None], dtype=object)
+        return merged
+
+    def _last(self, rows: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Latest row per (country, ticker, metric, source)."""
+        if len(rows['observed']) == 0:
+            return rows
+        # Partitions come in month order and rows in append order, so a stable sort keeps ties ordered
+        order = np.lexsort((rows['observed'], rows['source'], rows['metric'], rows['ticker'], rows['country']))
+        keys = np.stack([rows[name][order] for name in ('country', 'ticker', 'metric', 'source')])
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (keys[:, 1:] != keys[:, :-1]).any(axis=0)
+        picked = order[last]
+        return {name: column if name == 'country_names' else column[picked] for name, column in rows.items()}
+
+    def _decode(self, rows: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        strings = np.array(self.strings.values + [None], dtype=object)
+        updated = rows['updated'].astype(np.int64).astype('datetime64[D]')
+        updated[rows['updated'] == NO_DATE] = np.datetime64('NaT')
+        return {
+            'country': rows['country_names'][rows['country']],
+            'ticker': strings[rows['ticker']],
+            'metric': strings[rows['metric']],
+            'source': strings[rows['source']],
+            'observed': rows['observed'],
+            'value': rows['value'],
+            'text': strings[rows['text']],
+            'updated': updated,
+        }
+
+    def _latest_values(self) -> Dict[Tuple[str, int, int, int], Tuple[float, int]]:
+        """Latest (value, text) per key, built from disk on the first append."""
+        if self._latest is None:
+            rows = self._last(self._scan(None, None, None, None, None))
+            countries = rows['country_names'][rows['country']]
+            self._latest = {
+                (country, int(ticker), int(metric), int(source)): (float(value), int(text))
+                for country, ticker, metric, source, value, text in zip(
+                    countries, rows['ticker'], rows['metric'], rows['source'], rows['value'], rows['text'])
+            }
+        return self._latest
+
+    def _codes(self, values: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        if values is None:
+            return None
+        return np.array([self.strings.codes[value] for value in values if value in self.strings.codes],
+                        dtype=np.int32)
+
+    def _encode(self, value: Optional[str]) -> int:
+        if value is None or value in self.strings.codes:
+            return self.strings.encode(value)
+        # Persist the string before any column row can refer to its code
+        line = (json.dumps(value) + '\n').encode('utf-8')
+        self._writing()
+        with open(self._strings_path, 'ab') as f:
+            f.write(line)
+        # Called under the store lock, after catching up, so this is the end of the file
+        self._strings_read += len(line)
+        return self.strings.encode(value)
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the store's lock file and catch up with what other processes appended."""
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            os.lseek(self._lock_fd, 0, os.SEEK_SET)
+            generation = int(os.read(self._lock_fd, 32) or 0)
+            if generation != self._generation:
+                # Someone else wrote (or crashed writing): reread strings, rescan, recheck columns
+                self._load_strings(repair=True)
+                self._latest = None
+                self._repaired.clear()
+                self._generation = generation
+            self._written = False
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _writing(self):
+        """Announce a write to other processes, once per lock hold, before making it."""
+        if self._written:
+            return
+        self._generation += 1
+        # Plain seek and write, which unlike pread/pwrite also exist on Windows
+        os.ftruncate(self._lock_fd, 0)
+        os.lseek(self._lock_fd, 0, os.SEEK_SET)
+        os.write(self._lock_fd, str(self._generation).encode())
+        self._written = True
+
+    def _load_strings(self, repair: bool = False):
+        """Read strings appended since the last call; ``repair`` drops a torn final line."""
+        if not self._strings_path.exists():
+            return
+        with open(self._strings_path, 'rb') as f:
+            f.seek(self._strings_read)
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if repair and complete < len(data):
+            # Only safe under the store lock: no writer is mid-line and no row refers to it yet
+            with open(self._strings_path, 'r+b') as f:
+                f.truncate(self._strings_read + complete)
+        for line in data[:complete].decode('utf-8').splitlines():
+            self.strings.encode(json.loads(line))
+        self._strings_read += complete
+
+def _same(old: Tuple[float, int], new: Tuple[float, int]) -> bool:
+    if old[1] != new[1]:
+        return False
+    return old[0] == new[0] or (math.isnan(old[0]) and math.isnan(new[0]))
@@ -0,0 +1,196 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, TextIO, Tuple
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# A mutable cell rather than a bool, so work run in a copied context (executor
+# threads started for an asyncio task) flags the caller's cell
+_fallback_flag: contextvars.ContextVar = contextvars.ContextVar('esg_fallback_flag')
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def sample(name: str, **labels) -> Tuple[str, LabelKey]:
+    """Key for one gauge sample returned by a collector."""
+    return name, _labels(labels)
+
+def _escape(value: str) -> str:
+    # Label value escaping from the Prometheus text exposition format
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(key: LabelKey, extra: str = '') -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+class Metrics:
+    """Process-wide counters and latency histograms with Prometheus text output.
+
+    ``stage()`` times a block into ``esg_stage_seconds`` and, when a trace log is
+    configured (ESG_TRACE_LOG or ``set_trace_log``), appends one JSON line per
+    stage with its labels and duration.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._collectors = []
+        self._trace = None
+        trace_path = os.getenv('ESG_TRACE_LOG')
+        if trace_path:
+            self.set_trace_log(open(trace_path, 'a'))
+
+    def set_trace_log(self, stream: Optional[TextIO]):
+        self._trace = stream
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        with self._lock:
+            self._counters[(name, _labels(labels))] += value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(BUCKETS), 0, 0.0]
+            buckets, _, _ = histogram
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    @contextmanager
+    def stage(self, stage: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('esg_stage_seconds', elapsed, stage=stage, **labels)
+            self.trace(stage, elapsed, **labels)
+
+    def timed(self, stage: str, **labels):
+        """Decorator form of ``stage``."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def trace(self, stage: str, duration: float, **fields):
+        if self._trace is None:
+            return
+        line = json.dumps({'ts': time.time(), 'stage': stage, 'duration': round(duration, 6), **fields},
+                          default=str)
+        with self._lock:
+            self._trace.write(line + '\n')
+            self._trace.flush()
+
+    def fallback(self, source: str, error: Optional[BaseException] = None):
+        """Record that ``source`` served fallback data instead of its own."""
+        reason = type(error).__name__ if error is not None else None
+        self.inc('esg_fallback_total', source=source, reason=reason)
+        self.trace('fallback', 0.0, source=source, error=str(error) if error is not None else None)
+        flag = _fallback_flag.get(None)
+        if flag is None:
+            flag = [False]
+            _fallback_flag.set(flag)
+        flag[0] = True
+
+    def take_fallback(self) -> bool:
+        """Whether ``fallback`` was called in this thread or task since the last check."""
+        flag = _fallback_flag.get(None)
+        _fallback_flag.set([False])
+        return bool(flag and flag[0])
+
+    def register_collector(self, collector: Callable[[], Dict[Tuple[str, LabelKey], float]]):
+        """Add a callable returning gauge values ``{(name, labels): value}`` at render time.
+
+        Bound methods are held weakly, so registering an object does not keep it alive.
+        """
+        ref = weakref.WeakMethod(collector) if hasattr(collector, '__self__') else (lambda: collector)
+        with self._lock:
+            self._collectors.append(ref)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h[0]), h[1], h[2]) for key, h in self._histograms.items()}
+            collectors = list(self._collectors)
+        # Collectors run outside the lock, since they may record metrics themselves
+        gauges = {}
+        for ref in collectors:
+            collector = ref()
+            if collector is None:
+                with self._lock:
+                    if ref in self._collectors:
+                        self._collectors.remove(ref)
+            else:
+                gauges.update(collector())
+
+        lines = []
+        for kind, samples in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in samples}):
+                lines.append(f'# TYPE {name} {kind}')
+                for (sample_name, key), value in sorted(samples.items()):
+                    if sample_name == name:
+                        lines.append(f'{name}{_format_labels(key)} {value}')
+
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f'# TYPE {name} histogram')
+            for (sample_name, key), (buckets, count, total) in sorted(histograms.items()):
+                if sample_name != name:
+                    continue
+                for bound, bucket_count in zip(BUCKETS + ('+Inf',), buckets + [count]):
+                    le = 'le="%s"' % bound
+                    lines.append(f'{name}_bucket{_format_labels(key, le)} {bucket_count}')
+                lines.append(f'{name}_count{_format_labels(key)} {count}')
+                lines.append(f'{name}_sum{_format_labels(key)} {total}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Expose ``/metrics`` on a background thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+metrics = Metrics()
@@ -0,0 +1,174 @@
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d %b %Y', '%b %d, %Y')
+
+class Dictionary:
+    """Interns strings to dense int32 codes."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code] if code >= 0 else None
+
+    def __len__(self):
+        return len(self.values)
+
+def parse_value(value: Any) -> float:
+    if value is None or isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip().rstrip('%').replace(',', ''))
+    except ValueError:
+        return math.nan
+
+def parse_date(value: Any) -> np.datetime64:
+    if not value:
+        return np.datetime64('NaT', 'D')
+    text = str(value).strip()
+    try:
+        return np.datetime64(text[:10], 'D')
+    except ValueError:
+        pass
+    from datetime import datetime
+    for fmt in DATE_FORMATS:
+        try:
+            return np.datetime64(datetime.strptime(text, fmt).date(), 'D')
+        except ValueError:
+            continue
+    return np.datetime64('NaT', 'D')
+
+class MetricFrame:
+    """Columnar store for plugin results.
+
+    One row per metric. Tickers, companies, countries, metric names and sources
+    are dictionary-encoded int32 columns, values are float64 (NaN when the
+    plugin returned text, which is kept in a sparse side table) and dates are
+    parsed once into datetime64[D]. Columns grow geometrically, and the
+    accessors return views of the filled prefix rather than copies.
+    """
+
+    CODE_COLUMNS = ('ticker', 'company', 'country', 'name', 'source')
+
+    def __init__(self, capacity: int = 1024):
+        self.dictionaries = {column: Dictionary() for column in self.CODE_COLUMNS}
+        self._codes = {column: np.empty(capacity, dtype=np.int32) for column in self.CODE_COLUMNS}
+        self._values = np.empty(capacity, dtype=np.float64)
+        self._updated = np.empty(capacity, dtype='datetime64[D]')
+        self.text = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self._size]
+
+    @property
+    def updated(self) -> np.ndarray:
+        return self._updated[:self._size]
+
+    def codes(self, column: str) -> np.ndarray:
+        return self._codes[column][:self._size]
+
+    def categories(self, column: str) -> List[str]:
+        return self.dictionaries[column].values
+
+    def column(self, column: str) -> np.ndarray:
+        """Decoded string column (materialises an object array)."""
+        categories = np.array(self.categories(column) + [None], dtype=object)
+        return categories[self.codes(column)]
+
+    def append(self, country: str, ticker: str, result: Dict[str, Any]):
+        if not result or 'error' in result:
+            return
+        company = result.get('company')
+        for metric in result.get('metrics', []):
+            if not metric:
+                continue
+            self._append_row(country, ticker, company, metric)
+
+    def extend(self, results: Iterable[Tuple[str, str, Dict[str, Any]]]) -> 'MetricFrame':
+        for country, ticker, result in results:
+            self.append(country, ticker, result)
+        return self
+
+    def rows(self, ticker: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield rows back in the plugin dict shape, optionally for one ticker."""
+        indices = range(self._size)
+        if ticker is not None:
+            code = self.dictionaries['ticker'].codes.get(ticker)
+            if code is None:
+                return
+            indices = np.flatnonzero(self.codes('ticker') == code)
+
+        names, sources = self.dictionaries['name'], self.dictionaries['source']
+        for i in indices:
+            value = self._values[i]
+            updated = self._updated[i]
+            yield {
+                'name': names.decode(self._codes['name'][i]),
+                'value': self.text.get(int(i), None if math.isnan(value) else float(value)),
+                'source': sources.decode(self._codes['source'][i]),
+                'updated': None if np.isnat(updated) else str(updated),
+            }
+
+    def to_pandas(self):
+        import pandas as pd
+        data = {
+            column: pd.Categorical.from_codes(self.codes(column), self.categories(column))
+            for column in self.CODE_COLUMNS
+        }
+        data['value'] = self.values
+        if self.text:
+            # Ratings like 'AA' have no numeric value; show the text rather than NaN
+            values = self.values.astype(object)
+            for i, text in self.text.items():
+                values[i] = text
+            data['value'] = values
+        data['updated'] = self.updated
+        return pd.DataFrame(data, copy=False)
+
+    @property
+    def nbytes(self) -> int:
+        return (sum(codes.nbytes for codes in self._codes.values())
+                + self._values.nbytes + self._updated.nbytes)
+
+    def _append_row(self, country: str, ticker: str, company: Optional[str], metric: Dict[str, Any]):
+        if self._size == len(self._values):
+            self._grow()
+        i = self._size
+        encoded = {'ticker': ticker, 'company': company, 'country': country,
+                   'name': metric.get('name'), 'source': metric.get('source')}
+        for column, value in encoded.items():
+            self._codes[column][i] = self.dictionaries[column].encode(value)
+
+        raw = metric.get('value')
+        self._values[i] = parse_value(raw)
+        if math.isnan(self._values[i]) and raw not in (None, ''):
+            self.text[i] = str(raw)
+        self._updated[i] = parse_date(metric.get('updated'))
+        self._size += 1
+
+    def _grow(self):
+        capacity = max(1024, len(self._values) * 2)
+        for column, codes in self._codes.items():
+            self._codes[column] = np.resize(codes, capacity)
+        self._values = np.resize(self._values, capacity)
+        self._updated = np.resize(self._updated, capacity)
@@ -0,0 +1,96 @@
+import asyncio
+import contextvars
+import inspect
+from concurrent.futures import Executor
+from functools import partial
+from types import ModuleType
+from typing import Any, Dict, Optional, Protocol, Sequence
+
+from core.transport import HTTPTransport
+
+Result = Dict[str, Any]
+
+class Capabilities:
+    """What a plugin declares about itself.
+
+    ``batch``: it can fetch many symbols in one request. ``needs_browser``: it
+    drives a browser session, so its concurrency is bounded by the browser pool.
+    ``hosts``: the hosts it talks to, which the engine uses as its concurrency key.
+    """
+
+    __slots__ = ('batch', 'needs_browser', 'hosts', 'max_batch')
+
+    def __init__(self, batch: bool = False, needs_browser: bool = False, hosts: Sequence[str] = (),
+                 max_batch: int = 100):
+        self.batch = batch
+        self.needs_browser = needs_browser
+        self.hosts = tuple(hosts)
+        self.max_batch = max_batch
+
+    def __repr__(self):
+        return (f"Capabilities(batch={self.batch}, needs_browser={self.needs_browser}, "
+                f"hosts={self.hosts!r})")
+
+class ESGPlugin(Protocol):
+    """Async interface the engine drives plugins through."""
+
+    source: str
+    capabilities: Capabilities
+
+    async def fetch(self, ticker: str, transport: HTTPTransport) -> Result:
+        ...
+
+    async def fetch_batch(self, tickers: Sequence[str], transport: HTTPTransport) -> Dict[str, Result]:
+        ...
+
+class ModulePlugin:
+    """ESGPlugin over a module in plugins/.
+
+    A module provides ``async def fetch(ticker, transport)``, the blocking
+    ``get_esg_data(ticker, transport)``, or both; the blocking form runs on
+    ``executor`` so it never stalls the event loop. Batch support comes from
+    ``async def fetch_batch(tickers, transport)`` or a blocking
+    ``get_esg_data_batch``, which may leave out tickers it cannot serve for the
+    caller to fetch singly. ``SOURCE`` and ``CAPABILITIES`` are read when present.
+    """
+
+    def __init__(self, module: ModuleType, executor: Optional[Executor] = None):
+        self.module = module
+        self.executor = executor
+        self.name = module.__name__.rsplit('.', 1)[-1]
+        self.source = getattr(module, 'SOURCE', self.name)
+        declared = getattr(module, 'CAPABILITIES', None) or Capabilities()
+        self.capabilities = Capabilities(
+            batch=declared.batch or hasattr(module, 'fetch_batch') or hasattr(module, 'get_esg_data_batch'),
+            needs_browser=declared.needs_browser, hosts=declared.hosts, max_batch=declared.max_batch)
+
+    @property
+    def native(self) -> bool:
+        """Whether the module has its own coroutine rather than going through the executor."""
+        return inspect.iscoroutinefunction(getattr(self.module, 'fetch', None))
+
+    async def fetch(self, ticker: str, transport: HTTPTransport) -> Result:
+        if self.native:
+            return await self.module.fetch(ticker, transport=transport)
+        return await self._blocking(self.module.get_esg_data, ticker, transport=transport)
+
+    async def fetch_batch(self, tickers: Sequence[str], transport: HTTPTransport) -> Dict[str, Result]:
+        """Results keyed by ticker; without batch support the tickers are fetched concurrently."""
+        batch = getattr(self.module, 'fetch_batch', None)
+        if inspect.iscoroutinefunction(batch):
+            return await batch(list(tickers), transport=transport)
+        if hasattr(self.module, 'get_esg_data_batch'):
+            return await self._blocking(self.module.get_esg_data_batch, list(tickers), transport=transport)
+        results = await asyncio.gather(*(self.fetch(ticker, transport) for ticker in tickers),
+                                       return_exceptions=True)
+        return {ticker: {'error': str(result)} if isinstance(result, BaseException) else result
+                for ticker, result in zip(tickers, results)}
+
+    async def _blocking(self, func, *args, **kwargs) -> Any:
+        # The copied context carries the task's fallback flag into the worker thread
+        context = contextvars.copy_context()
+        call = partial(context.run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def __repr__(self):
+        return f"ModulePlugin({self.name!r}, {self.capabilities!r})"
@@ -0,0 +1,44 @@
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+def measure_imports(code: str = "import main; main.ESGApp()") -> List[Tuple[str, int, int, int]]:
+    """Run ``code`` in a fresh interpreter with ``-X importtime``.
+
+    Returns ``(module, self_us, cumulative_us, depth)`` for every module imported,
+    in import order.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+def report_startup(top: int = 25, console: Console = None):
+    console = console or Console(stderr=True)
+    rows = measure_imports()
+    if not rows:
+        console.print("[red]Could not collect import timings[/]")
+        return
+
+    total_us = sum(row[1] for row in rows)
+    table = Table(title=f"Startup import cost ({total_us / 1000:.1f} ms, {len(rows)} modules)",
+                  title_style="bold magenta")
+    table.add_column("Module", style="cyan")
+    table.add_column("Self (ms)", justify="right", style="green")
+    table.add_column("Cumulative (ms)", justify="right", style="yellow")
+
+    for module, self_us, cumulative_us, _ in sorted(rows, key=lambda r: -r[1])[:top]:
+        table.add_row(module, f"{self_us / 1000:.1f}", f"{cumulative_us / 1000:.1f}")
+
+    console.print(table)
@@ -0,0 +1,188 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a host whose circuit is open."""
+
+class TokenBucket:
+    """Token bucket with additive-increase/multiplicative-decrease rate adaptation.
+
+    ``rate`` is the documented quota in requests per second and the ceiling the
+    bucket recovers to. ``throttle`` halves the current rate and pauses the bucket
+    (e.g. for a Retry-After); each success creeps the rate back up.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0, min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.burst = burst
+        self.tokens = burst
+        self._paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = max(self._paused_until - now, (1 - self.tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def throttle(self, retry_after: Optional[float] = None):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def reward(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+class CircuitBreaker:
+    """Opens after ``failures`` consecutive failures; lets one probe through after ``reset_after`` seconds."""
+
+    def __init__(self, failures: int = 5, reset_after: float = 60.0):
+        self.threshold = failures
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_after else 'open'
+
+    def allow(self) -> Tuple[bool, bool]:
+        """Whether a request may go out, and whether it is the half-open probe."""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True, False
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True, True
+            return False, False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release(self):
+        """End a probe that produced no verdict (a 429, a rate-limit wait that timed out)."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+class HostPolicy:
+    def __init__(self, host: str, bucket: Optional[TokenBucket], breaker: CircuitBreaker):
+        self.host = host
+        self.bucket = bucket
+        self.breaker = breaker
+
+class HostLimits:
+    """Per-host token buckets and circuit breakers, configured from config/sources.yaml.
+
+    A source entry may carry ``rate_limit: {per_minute, burst}`` and ``circuit:
+    {failures, reset_after}``; other hosts fall back to the top-level
+    ``rate_limit`` and ``circuit`` defaults.
+    """
+
+    def __init__(self, sources: Optional[Dict] = None):
+        sources = sources or {}
+        self.defaults = sources.get('circuit', {})
+        self.default_rate = sources.get('rate_limit')
+        self.configured = {}
+        for tier in sources.get('sources', {}).values():
+            for source in tier:
+                host = urlparse(source.get('endpoint', '')).hostname
+                if host:
+                    self.configured[host] = source
+        self._policies = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, path: str = 'config/sources.yaml') -> 'HostLimits':
+        import yaml
+        try:
+            with open(path) as f:
+                return cls(yaml.safe_load(f))
+        except FileNotFoundError:
+            return cls()
+
+    def policy(self, url: str) -> HostPolicy:
+        host = urlparse(url).hostname or ''
+        with self._lock:
+            policy = self._policies.get(host)
+            if policy is None:
+                policy = self._policies[host] = self._build(host)
+            return policy
+
+    @contextmanager
+    def guard(self, url: str, timeout: Optional[float] = None):
+        """Wait for a token and check the circuit; the body reports the outcome via the policy."""
+        policy = self.policy(url)
+        allowed, probe = policy.breaker.allow()
+        if not allowed:
+            raise CircuitOpenError(f"Circuit open for {policy.host}")
+        try:
+            if policy.bucket is not None and not policy.bucket.acquire(timeout):
+                raise TimeoutError(f"Rate limit for {policy.host} not available within {timeout}s")
+            yield policy
+        finally:
+            # A half-open probe the body neither passed nor failed must not block the host for good;
+            # requests admitted while the circuit was closed leave a later probe alone
+            if probe:
+                policy.breaker.release()
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            return {host: policy.breaker.state for host, policy in self._policies.items()}
+
+    def _build(self, host: str) -> HostPolicy:
+        source = self._source_for(host) or {}
+        circuit = {**self.defaults, **source.get('circuit', {})}
+        breaker = CircuitBreaker(circuit.get('failures', 5), circuit.get('reset_after', 60))
+
+        bucket = None
+        limit = source.get('rate_limit', self.default_rate)
+        if limit:
+            bucket = TokenBucket(limit['per_minute'] / 60.0, limit.get('burst', 1))
+        return HostPolicy(host, bucket, breaker)
+
+    def _source_for(self, host: str) -> Optional[Dict]:
+        # Exact host first, then any configured parent domain (api.x.com -> x.com)
+        for configured, source in self.configured.items():
+            if host == configured:
+                return source
+        for configured, source in self.configured.items():
+            bare = configured[4:] if configured.startswith('www.') else configured
+            if host.endswith('.' + bare) or host == bare:
+                return source
+        return None
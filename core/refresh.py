@@ -0,0 +1,156 @@
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from core.esg_engine import ESGEngine
+from core.metrics_store import parse_value
+
+def content_hash(data: Dict[str, Any]) -> str:
+    """Hash of the company and its metric names and values; stamps and sources are left out."""
+    # Fetch-time stamps (JP reports today's date) would otherwise make every fetch a change
+    content = [data.get('company'),
+               sorted((str(metric.get('name')), str(metric.get('value')))
+                      for metric in data.get('metrics', []) if metric)]
+    return hashlib.sha256(json.dumps(content, default=str).encode('utf-8')).hexdigest()
+
+def source_updated(data: Dict[str, Any]) -> Optional[str]:
+    """Latest ``updated``/``lastUpdated`` stamp any metric reports."""
+    stamps = [str(metric.get('updated') or metric.get('lastUpdated'))
+              for metric in data.get('metrics', [])
+              if metric and (metric.get('updated') or metric.get('lastUpdated'))]
+    return max(stamps) if stamps else None
+
+def score_deltas(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def by_name(data):
+        return {metric['name']: metric.get('value') for metric in data.get('metrics', [])
+                if metric and metric.get('name')}
+
+    before, after = by_name(old), by_name(new)
+    changes = []
+    for name in sorted(before.keys() | after.keys()):
+        if before.get(name) == after.get(name):
+            continue
+        change = {'metric': name, 'old': before.get(name), 'new': after.get(name)}
+        delta = parse_value(after.get(name)) - parse_value(before.get(name))
+        if delta == delta:
+            change['delta'] = delta
+        changes.append(change)
+    return changes
+
+class RefreshService:
+    """Keeps a ticker universe fresh with as few fetches as possible.
+
+    Each ticker is due again after its source TTL. When a refetch finds the same
+    metric values, the interval doubles (up to ``max_interval``); any change
+    resets it. Results are compared by a hash of the company and its metric names
+    and values (see ``content_hash``), so a ticker whose ``updated`` stamp moved
+    without its scores changing is neither re-stored nor reported. Tickers whose scores
+    moved emit a JSON line of per-metric deltas to ``feed`` and ``on_change``. The
+    schedule lives in SQLite, so a restart resumes where it left off.
+    """
+
+    def __init__(self, engine: Optional[ESGEngine] = None, state_path: str = '.esg_refresh.sqlite',
+                 feed: Optional[TextIO] = None, on_change: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 max_interval: int = 30 * 86400, concurrency: int = 8):
+        self.engine = engine or ESGEngine()
+        self.feed = feed
+        self.on_change = on_change
+        self.max_interval = max_interval
+        self.concurrency = concurrency
+        self.stats = {'fetched': 0, 'changed': 0, 'unchanged': 0, 'failed': 0}
+
+        self.db = sqlite3.connect(state_path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS schedule (
+                country TEXT, ticker TEXT, next_due REAL, interval REAL,
+                hash TEXT, source_updated TEXT, payload TEXT,
+                PRIMARY KEY (country, ticker)
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_due ON schedule (next_due)")
+        self.db.commit()
+
+    def track(self, pairs: Iterable[Tuple[str, str]]):
+        """Add tickers to the universe; ones already tracked keep their schedule.
+
+        Pairs with an empty country are routed by ticker suffix.
+        """
+        self.db.executemany(
+            "INSERT OR IGNORE INTO schedule (country, ticker, next_due, interval) VALUES (?, ?, 0, ?)",
+            [(country, ticker, self.engine.source_ttl(country))
+             for country, ticker in self.engine.resolve_many(pairs)])
+        self.db.commit()
+
+    def untrack(self, country: str, ticker: str):
+        self.db.execute("DELETE FROM schedule WHERE country=? AND ticker=?", (country, ticker))
+        self.db.commit()
+
+    def due(self, now: Optional[float] = None, limit: int = 1000) -> List[Tuple[str, str]]:
+        return self.db.execute(
+            "SELECT country, ticker FROM schedule WHERE next_due <= ? ORDER BY next_due LIMIT ?",
+            (now if now is not None else time.time(), limit)).fetchall()
+
+    def run_once(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Refresh every ticker that is due; returns counts for this pass."""
+        counts = dict.fromkeys(self.stats, 0)
+        due = self.due(now)
+        for country, ticker, data in self.engine.get_esg_data_many(
+                due, max_concurrency=self.concurrency, refresh=True):
+            outcome = self._apply(country, ticker, data)
+            counts[outcome] += 1
+            self.stats[outcome] += 1
+        self.db.commit()
+        return counts
+
+    def run_forever(self, poll: float = 30.0):
+        while True:
+            self.run_once()
+            next_due = self.db.execute("SELECT MIN(next_due) FROM schedule").fetchone()[0]
+            wait = poll if next_due is None else min(poll, max(0.0, next_due - time.time()))
+            time.sleep(wait)
+
+    def _apply(self, country: str, ticker: str, data: Dict[str, Any]) -> str:
+        row = self.db.execute(
+            "SELECT interval, hash, payload FROM schedule WHERE country=? AND ticker=?",
+            (country, ticker)).fetchone()
+        interval, old_hash, old_payload = row
+        base = self.engine.source_ttl(country)
+        now = time.time()
+
+        if not data or 'error' in data:
+            # Retry failures on the base interval rather than backing off
+            self._reschedule(country, ticker, now + base, interval)
+            return 'failed'
+
+        new_hash = content_hash(data)
+        if new_hash == old_hash:
+            interval = min(interval * 2, self.max_interval)
+            self._reschedule(country, ticker, now + interval, interval)
+            return 'unchanged'
+        interval = base
+        updated = source_updated(data)
+
+        self.db.execute(
+            "UPDATE schedule SET next_due=?, interval=?, hash=?, source_updated=?, payload=? "
+            "WHERE country=? AND ticker=?",
+            (now + interval, interval, new_hash, updated, json.dumps(data, default=str), country, ticker))
+
+        if old_payload is None:
+            return 'fetched'
+        changes = score_deltas(json.loads(old_payload), data)
+        if changes:
+            self._emit({'country': country, 'ticker': ticker, 'at': now,
+                        'source_updated': updated, 'changes': changes})
+        return 'changed'
+
+    def _reschedule(self, country: str, ticker: str, next_due: float, interval: float):
+        self.db.execute("UPDATE schedule SET next_due=?, interval=? WHERE country=? AND ticker=?",
+                        (next_due, interval, country, ticker))
+
+    def _emit(self, event: Dict[str, Any]):
+        if self.feed is not None:
+            self.feed.write(json.dumps(event, default=str) + '\n')
+            self.feed.flush()
+        if self.on_change is not None:
+            self.on_change(event)
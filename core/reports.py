@@ -0,0 +1,180 @@
+import mmap
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from html.parser import HTMLParser as _StdHTMLParser
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from core.transport import HTTPTransport, get_transport
+
+def _pdf_reader(stream):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        from PyPDF2 import PdfReader
+    return PdfReader(stream)
+
+@contextmanager
+def _mapped(path: Path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"{path} is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+def _extract_pdf_range(path: str, start: int, stop: int) -> List[str]:
+    # Runs in worker processes, each mapping the same file independently
+    with _mapped(Path(path)) as mapped:
+        reader = _pdf_reader(mapped)
+        return [reader.pages[i].extract_text() or '' for i in range(start, stop)]
+
+class PDFParser:
+    """Lazily extracts text page by page from a memory-mapped PDF.
+
+    Extraction runs in the calling process unless ``workers`` > 1, which spreads
+    pages over that many processes; worth it for large reports parsed one at a
+    time, not from plugin threads that may each be parsing one.
+    """
+
+    def __init__(self, path, workers: Optional[int] = None, pages_per_task: int = 8):
+        self.path = Path(path)
+        self.workers = workers or 1
+        self.pages_per_task = pages_per_task
+
+    def page_count(self) -> int:
+        with _mapped(self.path) as mapped:
+            return len(_pdf_reader(mapped).pages)
+
+    def pages(self) -> Iterator[str]:
+        count = self.page_count()
+        if self.workers <= 1 or count <= self.pages_per_task:
+            with _mapped(self.path) as mapped:
+                reader = _pdf_reader(mapped)
+                for page in reader.pages:
+                    yield page.extract_text() or ''
+            return
+
+        starts = range(0, count, self.pages_per_task)
+        stops = [min(start + self.pages_per_task, count) for start in starts]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                for texts in pool.map(_extract_pdf_range, [str(self.path)] * len(starts), starts, stops):
+                    yield from texts
+            except GeneratorExit:
+                # Closed early: drop the ranges not yet started rather than wait for them all
+                pool.shutdown(cancel_futures=True)
+                raise
+
+    def text(self) -> str:
+        return '\n'.join(self.pages())
+
+class _TextCollector(_StdHTMLParser):
+    BLOCKS = {'p', 'div', 'section', 'article', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'table'}
+    SKIP = {'script', 'style', 'noscript', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._current = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCKS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self.BLOCKS:
+            self._flush()
+
+    def handle_data(self, data):
+        # Kept raw: a chunk boundary (or an inline tag) can fall in the middle of a word
+        if not self._skipping:
+            self._current.append(data)
+
+    def _flush(self):
+        text = ' '.join(''.join(self._current).split())
+        self._current = []
+        if text:
+            self.blocks.append(text)
+
+class HTMLParser:
+    """Incremental HTML text extraction; the document is fed in fixed-size chunks."""
+
+    def __init__(self, path, chunk_size: int = 1 << 16, encoding: str = 'utf-8'):
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+
+    def pages(self) -> Iterator[str]:
+        """Yields text blocks (paragraphs, headings, rows) as they are parsed."""
+        collector = _TextCollector()
+        with open(self.path, encoding=self.encoding, errors='replace') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), ''):
+                collector.feed(chunk)
+                yield from collector.blocks
+                collector.blocks.clear()
+        collector.close()
+        collector._flush()
+        yield from collector.blocks
+
+    def text(self) -> str:
+        return '\n'.join(self.pages())
+
+class XMLParser:
+    """iterparse-based extraction that frees and detaches each element once its text is read."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def pages(self) -> Iterator[str]:
+        parents = []
+        for event, element in ET.iterparse(self.path, events=('start', 'end')):
+            if event == 'start':
+                parents.append(element)
+                continue
+            parents.pop()
+            if element.text and element.text.strip():
+                yield element.text.strip()
+            element.clear()
+            if parents:
+                # Cleared elements would otherwise stay attached and pile up under their parent
+                parents[-1].remove(element)
+
+    def text(self) -> str:
+        return '\n'.join(self.pages())
+
+PARSERS = {'pdf': PDFParser, 'html': HTMLParser, 'xml': XMLParser}
+
+def detect_type(url: str, content_type: str = '') -> str:
+    content_type = content_type.lower()
+    path = url.lower().split('?', 1)[0]
+    if 'pdf' in content_type or path.endswith('.pdf'):
+        return 'pdf'
+    if 'xml' in content_type and 'html' not in content_type or path.endswith('.xml'):
+        return 'xml'
+    return 'html'
+
+@contextmanager
+def fetch_report(url: str, transport: Optional[HTTPTransport] = None):
+    """Download ``url`` to a temporary file and yield ``(path, file_type)``; the file is removed after."""
+    handle = tempfile.NamedTemporaryFile(prefix='esg_report_', delete=False)
+    try:
+        with handle:
+            headers = (transport or get_transport()).download(url, handle)
+        yield Path(handle.name), detect_type(url, headers.get('Content-Type', ''))
+    finally:
+        os.unlink(handle.name)
+
+def iter_report_pages(url: str, transport: Optional[HTTPTransport] = None,
+                      workers: Optional[int] = None) -> Iterator[str]:
+    """Stream a remote PDF/HTML/XML report and yield its text page by page."""
+    with fetch_report(url, transport) as (path, file_type):
+        parser = PDFParser(path, workers=workers) if file_type == 'pdf' else PARSERS[file_type](path)
+        yield from parser.pages()
@@ -0,0 +1,155 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence
+
+import yaml
+
+UNKNOWN_EXCHANGE = 'Unknown Exchange'
+
+# Exchange names for ticker suffixes; config/countries.yaml maps suffixes to countries
+EXCHANGE_SUFFIXES = {
+    '.US': 'Yahoo Finance',
+    '.L': 'London SE',
+    '.TO': 'Toronto SE',
+    '.PA': 'Euronext Paris',
+    '.BR': 'Euronext Brussels',
+    '.AS': 'Euronext Amsterdam',
+    '.LS': 'Euronext Lisbon',
+    '.MI': 'Borsa Italiana',
+    '.VI': 'Vienna SE',
+    '.BE': 'Berlin SE',
+    '.F': 'Frankfurt SE',
+    '.DE': 'XETRA',
+    '.SG': 'Singapore SGX',
+    '.SI': 'Singapore SGX',
+    '.HK': 'Hong Kong SE',
+    '.SZ': 'Shenzhen SE',
+    '.SS': 'Shanghai SE',
+    '.KS': 'Korea SE',
+    '.KQ': 'KOSDAQ',
+    '.TW': 'Taiwan SE',
+    '.T': 'Tokyo SE',
+    '.TA': 'Tel Aviv SE',
+    '.SA': 'Saudi SE',
+    '.BA': 'Buenos Aires SE',
+    '.MX': 'Mexican SE',
+    '.JK': 'Indonesia SE',
+    '.NS': 'India NSE',
+    '.BO': 'India BSE',
+    '.AX': 'Australia ASX',
+    '.NZ': 'New Zealand SE'
+}
+
+class Route:
+    """Where a ticker belongs: its exchange, country and plugin, and the symbol without suffix."""
+
+    __slots__ = ('suffix', 'exchange', 'country', 'plugin', 'symbol')
+
+    def __init__(self, suffix: str, exchange: str, country: Optional[str], plugin: Optional[str],
+                 symbol: str = ''):
+        self.suffix = suffix
+        self.exchange = exchange
+        self.country = country
+        self.plugin = plugin
+        self.symbol = symbol
+
+    def __repr__(self):
+        return f"Route({self.symbol!r}, suffix={self.suffix!r}, exchange={self.exchange!r}, country={self.country!r})"
+
+class RoutingIndex:
+    """Reverse-suffix trie from ticker suffixes (``.T``, ``.TA``, ``.KL``...) to routes.
+
+    Built once from an exchange-suffix table and the ``suffixes`` lists in
+    config/countries.yaml. Tickers are matched from the end, so the longest
+    configured suffix always wins regardless of table order. Tickers without a
+    known suffix route to ``default_country``.
+    """
+
+    def __init__(self, exchange_suffixes: Dict[str, str], countries: Dict[str, Dict],
+                 default_country: Optional[str] = None):
+        self.default_country = default_country
+        self.countries = countries
+        self._trie: Dict = {}
+
+        owners = {}
+        for code, info in countries.items():
+            for suffix in info.get('suffixes', []):
+                owners[suffix.upper()] = code
+        for suffix in set(owners) | {suffix.upper() for suffix in exchange_suffixes}:
+            country = owners.get(suffix)
+            exchange = exchange_suffixes.get(suffix) or self._country_exchange(country)
+            self._insert(suffix, Route(suffix, exchange, country, self._plugin(country)))
+
+    def route(self, ticker: str) -> Route:
+        ticker = ticker.strip().upper()
+        node, match, depth = self._trie, None, 0
+        for i, char in enumerate(reversed(ticker)):
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node and i + 1 < len(ticker):
+                match, depth = node[None], i + 1
+        if match is None:
+            country = self.default_country
+            return Route('', UNKNOWN_EXCHANGE, country, self._plugin(country), ticker)
+        return Route(match.suffix, match.exchange, match.country, match.plugin, ticker[:-depth])
+
+    def exchange(self, ticker: str) -> str:
+        return self.route(ticker).exchange
+
+    def symbol(self, ticker: str, country: str) -> str:
+        """``ticker`` without its suffix when the suffix belongs to ``country``."""
+        route = self.route(ticker)
+        return route.symbol if route.suffix and route.country == country else ticker.strip()
+
+    def classify(self, tickers: Sequence[str]) -> Dict[str, Any]:
+        """Route many tickers at once; returns aligned ``exchange``, ``country`` and ``symbol`` arrays.
+
+        Each distinct suffix is looked up once, so large batches of tickers from a
+        handful of exchanges cost little more than the NumPy string operations.
+        Results match ``route`` ticker for ticker.
+        """
+        import numpy as np
+        upper = np.char.upper(np.char.strip(np.asarray(tickers, dtype=str).ravel()))
+        if upper.size == 0:
+            empty = np.array([], dtype=object)
+            return {'exchange': empty, 'country': empty.copy(), 'symbol': upper}
+        parts = np.char.rpartition(upper, '.')
+        head = parts[:, 0]
+        suffixes = np.char.add(parts[:, 1], parts[:, 2])
+        uniques, inverse = np.unique(suffixes, return_inverse=True)
+
+        # Route one representative ticker per suffix; the trie settles overlaps
+        routes = [self.route('X' + suffix) for suffix in uniques]
+        exchanges = np.array([route.exchange for route in routes], dtype=object)[inverse]
+        countries = np.array([route.country for route in routes], dtype=object)[inverse]
+        # A bare suffix (``.T``) has no symbol in front of it, so like ``route`` treat it as unmatched
+        matched = np.array([bool(route.suffix) for route in routes])[inverse] & (head != '')
+        unmatched = self.route('')
+        return {'exchange': np.where(matched, exchanges, unmatched.exchange),
+                'country': np.where(matched, countries, unmatched.country),
+                'symbol': np.where(matched, head, upper)}
+
+    def _insert(self, suffix: str, route: Route):
+        node = self._trie
+        for char in reversed(suffix):
+            node = node.setdefault(char, {})
+        node[None] = route
+
+    def _country_exchange(self, country: Optional[str]) -> str:
+        exchanges = self.countries.get(country, {}).get('exchanges') if country else None
+        return exchanges[0] if exchanges else UNKNOWN_EXCHANGE
+
+    def _plugin(self, country: Optional[str]) -> Optional[str]:
+        if country not in self.countries:
+            return None
+        return self.countries[country].get('plugin', country)
+
+@lru_cache(maxsize=None)
+def get_routing(path: str = 'config/countries.yaml') -> RoutingIndex:
+    """Process-wide routing index over EXCHANGE_SUFFIXES and ``path``."""
+    try:
+        with open(path) as f:
+            config = yaml.safe_load(f)
+    except FileNotFoundError:
+        config = {}
+    return RoutingIndex(EXCHANGE_SUFFIXES, config.get('countries', {}), config.get('default_country'))
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays in-process
+    fcntl = None
+
+from core.instrumentation import metrics
+
+class SingleFlight:
+    """Concurrent calls for the same key share one execution and its result.
+
+    The first caller for a key runs the work; callers arriving while it runs
+    wait for and receive the same result (or exception). Nothing is remembered
+    once the call finishes, so this is deduplication, not caching.
+
+    With ``lock_dir`` the leader also holds an exclusive lock file per key, so
+    leaders in other processes queue behind it. After getting the lock a leader
+    calls ``recheck``; a non-None value (e.g. what the other process just put in
+    the shared cache) is returned without doing the work again.
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None, name: str = ''):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def do(self, key: Hashable, work: Callable[[], Any],
+           recheck: Optional[Callable[[], Any]] = None) -> Any:
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            with self._process_lock(key):
+                result = self._recheck(recheck)
+                if result is None:
+                    result = work()
+        except BaseException as e:
+            self._finish(key, future, exception=e)
+            # The traceback holds this frame; dropping the Future here keeps them from forming
+            # a cycle that would pin every frame (and parsed page) of the failure until a GC pass
+            future = None
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ado(self, key: Hashable, work: Callable[[], Awaitable[Any]],
+                  recheck: Optional[Callable[[], Any]] = None) -> Any:
+        """``do`` for coroutines; sync and async callers of one key share a flight."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        loop = asyncio.get_running_loop()
+        handle = None
+        try:
+            if self.lock_dir:
+                # flock blocks, so wait for it off the event loop
+                acquiring = loop.run_in_executor(None, self._acquire, key)
+                try:
+                    handle = await asyncio.shield(acquiring)
+                except asyncio.CancelledError:
+                    acquiring.add_done_callback(
+                        lambda done: done.exception() is None and self._release(done.result()))
+                    raise
+            result = self._recheck(recheck) if handle is not None else None
+            if result is None:
+                result = await work()
+        except asyncio.CancelledError:
+            # Only the leader was cancelled (e.g. its caller timed out); the others get an error
+            self._finish(key, future, exception=RuntimeError('Coalesced fetch was cancelled'))
+            future = None
+            raise
+        except BaseException as e:
+            self._finish(key, future, exception=e)
+            future = None
+            raise
+        finally:
+            if handle is not None:
+                self._release(handle)
+        self._finish(key, future, result)
+        return result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _join(self, key: Hashable):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                metrics.inc('esg_coalesced_total', flight=self.name, scope='local')
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None,
+                exception: Optional[BaseException] = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def _recheck(self, recheck: Optional[Callable[[], Any]]) -> Any:
+        if recheck is None or not self.lock_dir:
+            return None
+        result = recheck()
+        if result is not None:
+            metrics.inc('esg_coalesced_total', flight=self.name, scope='process')
+        return result
+
+    @contextmanager
+    def _process_lock(self, key: Hashable):
+        if not self.lock_dir:
+            yield
+            return
+        handle = self._acquire(key)
+        try:
+            yield
+        finally:
+            self._release(handle)
+
+    def _acquire(self, key: Hashable):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        handle = open(os.path.join(self.lock_dir, f'{digest}.lock'), 'a+')
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _release(self, handle):
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
@@ -1,40 +1,140 @@
-from rich.console import Console
+import math
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from rich.console import Console, Group
+from rich.live import Live
 from rich.panel import Panel
 from rich.table import Table
-from rich.progress import Progress
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+
+class LiveDashboard:
+    """Results table that fills in while fetches are still running.
+
+    Rows are only appended as results arrive; drawing happens on Live's own
+    refresh thread at no more than ``max_fps`` frames a second, so a fast stream
+    of results never waits on the terminal. Each frame renders just the rows
+    that fit on screen (the newest ones), under a progress bar counting real
+    results against ``total``. After the run, ``page`` browses every row a
+    screen at a time.
+    """
+
+    # Lines taken by the progress bar, table borders, header and caption
+    CHROME = 8
+
+    def __init__(self, title: str, columns: Sequence[str], total: Optional[int] = None,
+                 console: Optional[Console] = None, max_fps: float = 4.0):
+        self.title = title
+        self.columns = list(columns)
+        self.console = console or Console()
+        self.rows: List[Tuple[List[str], bool]] = []
+        self.failed = 0
+        self._lock = threading.Lock()
+        self.progress = Progress(SpinnerColumn(), TextColumn("[cyan]{task.description}"), BarColumn(),
+                                 MofNCompleteColumn(), TimeElapsedColumn(), console=self.console)
+        self._task = self.progress.add_task(title, total=total)
+        self._live = Live(self, console=self.console, refresh_per_second=max_fps)
+
+    def __enter__(self) -> 'LiveDashboard':
+        self._live.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.progress.update(self._task, total=len(self.rows))
+        self._live.stop()
+
+    def add(self, cells: Sequence[str], ok: bool = True):
+        """Append one result row; ``ok=False`` counts it as failed and shows it in red."""
+        with self._lock:
+            self.rows.append(([str(cell) for cell in cells], ok))
+            if not ok:
+                self.failed += 1
+        self.progress.advance(self._task)
+
+    @property
+    def window(self) -> int:
+        """Rows that fit on screen below the progress bar."""
+        return max(5, self.console.size.height - self.CHROME)
+
+    @property
+    def overflowed(self) -> bool:
+        return len(self.rows) > self.window
+
+    def page(self, page_size: Optional[int] = None):
+        """Show all rows a page at a time, prompting between pages."""
+        size = page_size or self.window
+        pages = max(1, math.ceil(len(self.rows) / size))
+        page = 0
+        while True:
+            self.console.print(self._table(page * size, size))
+            if pages == 1:
+                return
+            choice = input(f"Page {page + 1}/{pages} - [n]ext, [p]revious, [q]uit: ").strip().lower()
+            if choice == 'q':
+                return
+            page = max(0, page - 1) if choice == 'p' else min(pages - 1, page + 1)
+
+    def __rich__(self):
+        with self._lock:
+            start = max(0, len(self.rows) - self.window)
+        return Group(self.progress, self._table(start, self.window))
+
+    def _table(self, start: int, size: int) -> Table:
+        with self._lock:
+            rows = self.rows[start:start + size]
+            count, failed = len(self.rows), self.failed
+        caption = f"rows {start + 1}-{start + len(rows)} of {count}" if rows else "waiting for results"
+        if failed:
+            caption += f" · {failed} failed"
+        table = Table(title=self.title, title_style="bold magenta", caption=caption)
+        for column in self.columns:
+            table.add_column(column, style="cyan" if column == self.columns[0] else "green")
+        for cells, ok in rows:
+            table.add_row(*cells, style=None if ok else "red")
+        return table
 
 class TerminalUI:
     def __init__(self):
         self.console = Console()
-        
+        self._header_shown = False
+
     def display_menu(self, options: list) -> str:
-        self.console.clear()
-        self.console.print(Panel.fit("[bold cyan]Global ESG Intelligence Platform[/]", 
-                                subtitle="[yellow]v3.0 • Multi-Market Support[/]"))
-        
+        # Scrollback is left alone; the banner is shown once rather than on every redraw
+        if not self._header_shown:
+            self.console.print(Panel.fit("[bold cyan]Global ESG Intelligence Platform[/]",
+                                    subtitle="[yellow]v3.0 • Multi-Market Support[/]"))
+            self._header_shown = True
+
         table = Table(show_header=False, padding=(0, 4))
         for i, (text, _) in enumerate(options, 1):
             table.add_row(f"[bold green]{i}.[/]", text)
         self.console.print(table)
-        
+
         return input("\nEnter your choice: ")
 
     def display_esg(self, data: dict):
-        table = Table(title=f"ESG Data for {data['company']}", 
+        table = Table(title=f"ESG Data for {data['company']}",
                     title_style="bold magenta")
-        
+
         table.add_column("Metric", style="cyan")
         table.add_column("Value", style="green")
         table.add_column("Source", style="yellow")
         table.add_column("Last Updated", style="blue")
 
         for metric in data['metrics']:
-            table.add_row(*metric.values())
+            table.add_row(*(str(value) for value in metric.values()))
+
+        self.console.print(table)
 
+    def display_table(self, title: str, columns: list, rows: list):
+        table = Table(title=title, title_style="bold magenta")
+        for column in columns:
+            table.add_column(column, style="cyan" if column == columns[0] else "green")
+        for row in rows:
+            table.add_row(*row)
         self.console.print(table)
 
-    def show_loading(self, message: str):
-        with Progress() as progress:
-            task = progress.add_task(f"[cyan]{message}...", total=100)
-            while not progress.finished:
-                progress.update(task, advance=0.5)
\ No newline at end of file
+    def live(self, title: str, columns: Iterable[str], total: Optional[int] = None,
+             max_fps: float = 4.0) -> LiveDashboard:
+        """A LiveDashboard on this UI's console; use it as a context manager."""
+        return LiveDashboard(title, list(columns), total=total, console=self.console, max_fps=max_fps)
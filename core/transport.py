@@ -0,0 +1,298 @@
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.instrumentation import metrics
+from core.ratelimit import HostLimits
+
+try:
+    import brotli  # noqa: F401 - urllib3 decodes 'br' only when brotli is importable
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+class TransportResponse:
+    """Response whose body is decoded at most once, however many times it is read.
+
+    JSON and ``extract`` results go in ``parsed``, which a revalidated response
+    shares with the one it stands in for, so unchanged pages are not parsed again.
+    """
+
+    def __init__(self, url: str, status_code: int, content: bytes, headers: Dict[str, str],
+                 encoding: Optional[str] = None, from_cache: bool = False,
+                 parsed: Optional[Dict] = None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.encoding = encoding or 'utf-8'
+        self.from_cache = from_cache
+        self._text = None
+        self._soup = None
+        self.parsed = {} if parsed is None else parsed
+
+    @property
+    def host(self) -> str:
+        return urlparse(self.url).hostname or ''
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.content.decode(self.encoding, errors='replace')
+        return self._text
+
+    def json(self) -> Any:
+        if 'json' not in self.parsed:
+            with metrics.stage('parse', host=self.host, format='json'):
+                self.parsed['json'] = json.loads(self.content)
+        return self.parsed['json']
+
+    def soup(self, parser: Optional[str] = None):
+        """Full BeautifulSoup tree; prefer ``extract`` when only a few values are needed."""
+        if self._soup is None:
+            from bs4 import BeautifulSoup
+            from core.extract import SOUP_PARSER
+            with metrics.stage('parse', host=self.host, format='html'):
+                self._soup = BeautifulSoup(self.text, parser or SOUP_PARSER)
+        return self._soup
+
+    def extract(self, fields) -> Dict[str, Optional[str]]:
+        """Values for ``fields`` (see core.extract), parsed once per field set."""
+        key = tuple(fields.items())
+        if key not in self.parsed:
+            from core.extract import extract
+            with metrics.stage('parse', host=self.host, format='extract'):
+                self.parsed[key] = extract(self.text, fields)
+        return self.parsed[key]
+
+    def extract_rows(self, row, key: str, cells, keys=None) -> Dict[str, Dict[str, Optional[str]]]:
+        """Per-row values from a listing page (see core.extract.extract_rows)."""
+        from core.extract import extract_rows
+        with metrics.stage('parse', host=self.host, format='extract'):
+            return extract_rows(self.text, row, key, cells, keys)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} for {self.url}")
+
+class _Validated:
+    """What revalidating a URL needs: its body, ETag/Last-Modified validators and parse results."""
+
+    __slots__ = ('url', 'content', 'encoding', 'etag', 'last_modified', 'parsed')
+
+    def __init__(self, response: TransportResponse):
+        self.url = response.url
+        self.content = response.content
+        self.encoding = response.encoding
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        # The response's own results dict, so values parsed after this point are kept too
+        self.parsed = response.parsed
+
+    def response(self) -> TransportResponse:
+        headers = {name: value for name, value in (('ETag', self.etag), ('Last-Modified', self.last_modified))
+                   if value}
+        return TransportResponse(self.url, 200, self.content, headers, self.encoding, from_cache=True,
+                                 parsed=self.parsed)
+
+class HTTPTransport:
+    """Shared HTTP client for plugins and scanners.
+
+    Keeps pooled keep-alive connections per host, retries transient failures
+    with exponential backoff and revalidates previously seen URLs with
+    ETag/If-Modified-Since so unchanged pages cost a 304 instead of a body;
+    the most recent bodies, up to ``validator_bytes`` in all, are kept for that.
+    Every request passes through per-host rate limits and circuit breakers;
+    429 responses slow the host down and honour Retry-After.
+
+    ``rewrite`` maps hostnames to another base URL (e.g. a local fixture server);
+    ``https://host/path`` is then requested as ``<base>/host/path``.
+    """
+
+    def __init__(self, pool_size: int = 16, retries: int = 3, backoff: float = 0.5,
+                 timeout: float = 10, validator_bytes: int = 32 << 20,
+                 limits: Optional[HostLimits] = None, rewrite: Optional[Dict[str, str]] = None):
+        self.timeout = timeout
+        self.rewrite = rewrite or {}
+        self.retries = retries
+        self.limits = limits or HostLimits()
+        self.validator_bytes = validator_bytes
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+
+        # 429s are left to ``_request``, which waits on the host's token bucket; urllib3
+        # would otherwise retry them itself, sleeping out Retry-After behind the limiter
+        retry = Retry(total=retries, backoff_factor=backoff,
+                      status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=('GET', 'HEAD'), respect_retry_after_header=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._validated = OrderedDict()
+        self._validated_size = 0
+
+    @classmethod
+    def from_config(cls, path: str = 'config/sources.yaml', **options) -> 'HTTPTransport':
+        """Transport with the rate limits in ``path`` and any ESG_HOST_REWRITE; ``options`` go to __init__."""
+        return cls(limits=HostLimits.from_config(path), rewrite=_rewrite_from_env(), **options)
+
+    def get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+            timeout: Optional[float] = None) -> TransportResponse:
+        cache_key = requests.Request('GET', url, params=params).prepare().url
+        headers = dict(headers or {})
+
+        with self._lock:
+            cached = self._validated.get(cache_key)
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+
+        raw = self._request(url, params=params, headers=headers, timeout=timeout or self.timeout)
+
+        if raw.status_code == 304:
+            if cached is not None:
+                return cached.response()
+            # Nothing stored to stand in for the body (the caller sent its own validators)
+            raw.close()
+            headers = {name: value for name, value in headers.items()
+                       if name.lower() not in ('if-none-match', 'if-modified-since')}
+            raw = self._request(url, params=params, headers=headers, timeout=timeout or self.timeout)
+            if raw.status_code == 304:
+                raise requests.HTTPError(f"304 without a stored body for {url}")
+
+        response = TransportResponse(raw.url, raw.status_code, raw.content,
+                                     dict(raw.headers), raw.encoding)
+        metrics.inc('esg_http_response_bytes_total', len(raw.content), host=response.host)
+        if response.ok and ('ETag' in raw.headers or 'Last-Modified' in raw.headers):
+            self._remember(cache_key, response)
+        return response
+
+    def download(self, url: str, dest: BinaryIO, chunk_size: int = 1 << 16,
+                 timeout: Optional[float] = None) -> Dict[str, str]:
+        """Stream a response body into ``dest`` without holding it in memory; returns headers."""
+        host = urlparse(url).hostname or ''
+        with self._request(url, stream=True, timeout=timeout or self.timeout) as raw:
+            raw.raise_for_status()
+            size = 0
+            with metrics.stage('download', host=host):
+                for chunk in raw.iter_content(chunk_size):
+                    dest.write(chunk)
+                    size += len(chunk)
+            metrics.inc('esg_http_response_bytes_total', size, host=host)
+            return dict(raw.headers)
+
+    def close(self):
+        self.session.close()
+
+    def _request(self, url: str, timeout: float, **kwargs) -> requests.Response:
+        for attempt in range(self.retries + 1):
+            with self.limits.guard(url) as policy:
+                started = time.perf_counter()
+                try:
+                    raw = self.session.get(self._target(url), timeout=timeout, **kwargs)
+                except requests.RequestException as e:
+                    policy.breaker.record_failure()
+                    metrics.inc('esg_http_requests_total', host=policy.host, status=type(e).__name__)
+                    raise
+                self._record(policy.host, raw, time.perf_counter() - started, kwargs.get('stream'))
+
+                if raw.status_code == 429:
+                    if policy.bucket is not None:
+                        policy.bucket.throttle(_retry_after(raw.headers.get('Retry-After')))
+                    if attempt < self.retries:
+                        raw.close()
+                        continue
+                elif raw.status_code >= 500:
+                    policy.breaker.record_failure()
+                else:
+                    policy.breaker.record_success()
+                    if policy.bucket is not None:
+                        policy.bucket.reward()
+                return raw
+        return raw
+
+    def _target(self, url: str) -> str:
+        if not self.rewrite:
+            return url
+        parts = urlparse(url)
+        base = self.rewrite.get(parts.hostname)
+        if base is None:
+            return url
+        return f"{base.rstrip('/')}/{parts.hostname}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else '')
+
+    def _record(self, host: str, raw: requests.Response, total: float, stream: bool):
+        # requests only reports time to response headers, which covers DNS, connect and
+        # server think time; for buffered responses the rest is the body download
+        connect = raw.elapsed.total_seconds()
+        metrics.inc('esg_http_requests_total', host=host, status=raw.status_code)
+        metrics.observe('esg_stage_seconds', connect, stage='connect', host=host)
+        if stream:
+            metrics.trace('connect', connect, host=host, status=raw.status_code)
+            return
+        download = max(0.0, total - connect)
+        metrics.observe('esg_stage_seconds', download, stage='download', host=host)
+        metrics.trace('request', total, host=host, status=raw.status_code, connect=round(connect, 6),
+                      download=round(download, 6), bytes=len(raw.content))
+
+    def _remember(self, key: str, response: TransportResponse):
+        if len(response.content) > self.validator_bytes:
+            return
+        with self._lock:
+            previous = self._validated.pop(key, None)
+            if previous is not None:
+                self._validated_size -= len(previous.content)
+            self._validated[key] = _Validated(response)
+            self._validated_size += len(response.content)
+            while self._validated_size > self.validator_bytes:
+                _, evicted = self._validated.popitem(last=False)
+                self._validated_size -= len(evicted.content)
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _rewrite_from_env() -> Dict[str, str]:
+    # ESG_HOST_REWRITE="www.jpx.co.jp=http://127.0.0.1:8000,finance.yahoo.com=http://127.0.0.1:8000"
+    pairs = (item.split('=', 1) for item in os.getenv('ESG_HOST_REWRITE', '').split(',') if '=' in item)
+    return {host.strip(): base.strip() for host, base in pairs}
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+def get_transport() -> HTTPTransport:
+    """Process-wide transport used when a caller does not supply its own."""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HTTPTransport.from_config()
+        return _default_transport
@@ -1,85 +1,147 @@
 # File: esg_global.py
 import os
 import re
-import requests
-import pandas as pd
-from bs4 import BeautifulSoup
+import threading
 from rich.console import Console
 from rich.table import Table
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Optional
+from core.cache import ResultCache
+from core.extract import Field
+from core.instrumentation import metrics
+from core.routing import get_routing
+from core.singleflight import SingleFlight
+from core.transport import HTTPTransport, get_transport
 
 console = Console()
 
 # Configuration
-EXCHANGE_SUFFIXES = {
-    '.US': 'Yahoo Finance',
-    '.L': 'London SE',
-    '.TO': 'Toronto SE',
-    '.PA': 'Euronext Paris',
-    '.BR': 'Euronext Brussels',
-    '.AS': 'Euronext Amsterdam',
-    '.LS': 'Euronext Lisbon',
-    '.MI': 'Borsa Italiana',
-    '.VI': 'Vienna SE',
-    '.BE': 'Berlin SE',
-    '.F': 'Frankfurt SE',
-    '.DE': 'XETRA',
-    '.SG': 'Singapore SGX',
-    '.SI': 'Singapore SGX',
-    '.HK': 'Hong Kong SE',
-    '.SZ': 'Shenzhen SE',
-    '.SS': 'Shanghai SE',
-    '.KS': 'Korea SE',
-    '.KQ': 'KOSDAQ',
-    '.TW': 'Taiwan SE',
-    '.T': 'Tokyo SE',
-    '.TA': 'Tel Aviv SE',
-    '.SA': 'Saudi SE',
-    '.BA': 'Buenos Aires SE',
-    '.MX': 'Mexican SE',
-    '.JK': 'Indonesia SE',
-    '.NS': 'India NSE',
-    '.BO': 'India BSE',
-    '.AX': 'Australia ASX',
-    '.NZ': 'New Zealand SE'
+SCORE_FIELDS = ('esg_score', 'environment', 'social', 'governance')
+
+def _yahoo_score(card: str) -> Field:
+    return Field('span', cls='score', inside=Field('section', attrs={'data-testid': f'{card}-score'}))
+
+YAHOO_FIELDS = {
+    'esg_score': _yahoo_score('total-esg'),
+    'environment': _yahoo_score('environment'),
+    'social': _yahoo_score('social'),
+    'governance': _yahoo_score('governance'),
 }
 
+LSE_FIELDS = {'esg_score': Field('div', cls='esg-rating')}
+
+# Hedged source requests from every scanner share one pool, so none has to be shut down
+# and losing requests still running in the background stay bounded
+_hedge_pool = None
+_hedge_lock = threading.Lock()
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=12, thread_name_prefix='esg-hedge')
+        return _hedge_pool
+
 class GlobalESGScanner:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+    def __init__(self, cache: Optional[ResultCache] = None,
+                 transport: Optional[HTTPTransport] = None,
+                 hedge_after: Optional[float] = 2.0):
+        """``hedge_after`` is how long a source may run before the next one is started
+        alongside it; 0 races every source at once and None tries them one by one."""
+        self.cache = cache or ResultCache()
+        self.transport = transport or get_transport()
+        self.hedge_after = hedge_after
+        self._flight = SingleFlight(os.getenv('ESG_LOCK_DIR'), name='global')
     
     def detect_exchange(self, ticker: str) -> str:
-        for suffix, exchange in EXCHANGE_SUFFIXES.items():
-            if ticker.upper().endswith(suffix):
-                return exchange
-        return 'Unknown Exchange'
+        return get_routing().exchange(ticker)
 
     def get_esg_data(self, ticker: str) -> Dict:
+        # Results come from whichever source answers first, so they share one cache slot
+        key = (self.detect_exchange(ticker), ticker.upper(), 'global')
+        return self.cache.get_or_fetch(
+            key,
+            lambda: self._flight.do(key, lambda: self._fetch(ticker), recheck=lambda: self._fresh(key))
+        )
+
+    def _fresh(self, key) -> Optional[Dict]:
+        # Another process may have just stored it, so skip the in-memory copy
+        payload, fresh = self.cache.reload(key)
+        return payload if fresh else None
+
+    def _fetch(self, ticker: str) -> Dict:
         exchange = self.detect_exchange(ticker)
         console.print(f"\n[cyan]Scanning {exchange} for {ticker}[/cyan]")
         
-        # Try multiple data sources
-        data = self._try_yahoo(ticker) or \
-               self._try_alpha_vantage(ticker) or \
-               self._try_exchange_scraping(ticker, exchange)
-        
+        # Try multiple data sources, in priority order
+        sources = [
+            lambda: self._try_yahoo(ticker),
+            lambda: self._try_alpha_vantage(ticker),
+            lambda: self._try_exchange_scraping(ticker, exchange)
+        ]
+        with metrics.stage('fetch', source='global', country=exchange):
+            if self.hedge_after is None:
+                data = next((d for d in (source() for source in sources) if self._acceptable(d)), None)
+            else:
+                data = self._hedged(sources)
+
+        # Yahoo is the primary source; any other winner is a fallback
+        winner = data.get('source') if data else None
+        outcome = 'error' if data is None else 'success' if winner == 'Yahoo Finance' else 'fallback'
+        metrics.inc('esg_fetch_total', source=winner or 'global', country=exchange, outcome=outcome)
         return data or {'error': 'ESG data not found'}
 
+    def _hedged(self, sources) -> Optional[Dict]:
+        """Start sources in priority order, each ``hedge_after`` seconds after the last
+        unless it already failed, and return the first acceptable result.
+
+        When several sources have succeeded by then the highest-priority one wins.
+        Losing requests that have not started are cancelled; running ones are left to
+        finish on the shared hedge pool and their results are ignored.
+        """
+        pending = {}
+        queued = iter(enumerate(sources))
+
+        def launch() -> bool:
+            entry = next(queued, None)
+            if entry is not None:
+                priority, source = entry
+                pending[_get_hedge_pool().submit(source)] = priority
+            return entry is not None
+
+        launch()
+        while self.hedge_after == 0 and launch():
+            pass
+
+        while pending:
+            done, _ = wait(pending, timeout=self.hedge_after or None, return_when=FIRST_COMPLETED)
+            winners = {}
+            for future in done:
+                priority = pending.pop(future)
+                data = future.result()
+                if self._acceptable(data):
+                    winners[priority] = data
+
+            if winners:
+                for future in pending:
+                    future.cancel()
+                return winners[min(winners)]
+
+            # Nothing usable yet: a source failed or the hedge delay passed
+            launch()
+        return None
+
+    def _acceptable(self, data: Optional[Dict]) -> bool:
+        return bool(data) and any(data.get(field) not in (None, '') for field in SCORE_FIELDS)
+
     def _try_yahoo(self, ticker: str) -> Optional[Dict]:
         try:
             url = f"https://finance.yahoo.com/quote/{ticker}/sustainability"
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            scores = self.transport.get(url, timeout=10).extract(YAHOO_FIELDS)
             
             return {
                 'ticker': ticker,
-                'esg_score': self._parse_yahoo_score(soup),
-                'environment': self._parse_yahoo_cat(soup, 'environment'),
-                'social': self._parse_yahoo_cat(soup, 'social'),
-                'governance': self._parse_yahoo_cat(soup, 'governance'),
+                **scores,
                 'source': 'Yahoo Finance'
             }
         except Exception as e:
@@ -92,7 +154,7 @@ class GlobalESGScanner:
             
         try:
             url = f"https://www.alphavantage.co/query?function=ESG_SCORE&symbol={ticker}&apikey={api_key}"
-            data = self.session.get(url).json()
+            data = self.transport.get(url).json()
             return {
                 'ticker': ticker,
                 'esg_score': data.get('ESG Score'),
@@ -101,7 +163,7 @@ class GlobalESGScanner:
                 'governance': data.get('Governance Score'),
                 'source': 'Alpha Vantage'
             }
-        except:
+        except Exception:
             return None
 
     def _try_exchange_scraping(self, ticker: str, exchange: str) -> Optional[Dict]:
@@ -118,23 +180,22 @@ class GlobalESGScanner:
             
             # Generic exchange scraper
             return self._generic_scrape(ticker, exchange)
-        except:
+        except Exception:
             return None
 
     def _scrape_lse(self, ticker: str) -> Dict:
         url = f"https://www.londonstockexchange.com/stock/{ticker}/esg"
-        response = self.session.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        scores = self.transport.get(url).extract(LSE_FIELDS)
         
         return {
             'ticker': ticker,
-            'esg_score': soup.find('div', class_='esg-rating').text,
+            **scores,
             'source': 'London Stock Exchange'
         }
 
     def _scrape_jpx(self, ticker: str) -> Dict:
         url = f"https://www.jpx.co.jp/english/listing/esg/{ticker}.html"
-        response = self.session.get(url)
+        response = self.transport.get(url)
         # ... (JPX-specific parsing logic)
         return jpx_data
 
@@ -165,8 +226,12 @@ def main():
             data = scanner.get_esg_data(ticker)
             scanner.display_results(data)
         elif choice == '2':
-            tickers = input("Enter tickers (comma-separated): ").split(',')
-            all_data = [scanner.get_esg_data(t.strip()) for t in tickers]
+            # One fetch per ticker however often it was typed, in first-seen order
+            tickers = dict.fromkeys(t.strip().upper() for t in input("Enter tickers (comma-separated): ").split(','))
+            tickers.pop('', None)
+            import pandas as pd
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                all_data = list(pool.map(scanner.get_esg_data, tickers))
             pd.DataFrame(all_data).to_excel('global_esg.xlsx')
             console.print("[green]Exported to global_esg.xlsx[/green]")
         elif choice == '3':
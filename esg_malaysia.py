@@ -1,14 +1,12 @@
 import argparse
 import os
 import sys
-import pandas as pd
-import requests
 from datetime import datetime
-from bs4 import BeautifulSoup
 from textwrap import wrap
 from rich.console import Console
-from rich.table import Table
-import openpyxl
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from core.extract import Field, require
+from core.transport import get_transport
 
 # Configuration
 console = Console()
@@ -39,83 +37,84 @@ def menu():
     console.print("5. Exit\n", style="bold yellow")
     return input("Enter choice (1-5): ")
 
+# Example selectors - adjust based on actual page structure
+ESG_FIELDS = {
+    category: Field('span', cls=f'{category}-score', inside=Field('div', cls='esg-score'))
+    for category in ('env', 'soc', 'gov')
+}
+
 def get_malaysia_esg(symbol):
     """Custom ESG data for Malaysian companies"""
     try:
         url = f"{MY_ESG_SOURCES['Bursa Malaysia']}/market/company/{symbol}"
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        scores = get_transport().get(url, timeout=10).extract(ESG_FIELDS)
         
-        # Example extraction - adjust based on actual page structure
-        esg_section = soup.find('div', {'class': 'esg-score'})
         return {
             'Symbol': symbol,
-            'Environment': float(esg_section.find('span', class_='env-score').text),
-            'Social': float(esg_section.find('span', class_='soc-score').text),
-            'Governance': float(esg_section.find('span', class_='gov-score').text),
+            'Environment': float(require(scores, 'env')),
+            'Social': float(require(scores, 'soc')),
+            'Governance': float(require(scores, 'gov')),
             'Source': 'Bursa Malaysia'
         }
     except Exception as e:
         console.print(f"[red]Error fetching Malaysia ESG: {e}[/red]")
         return None
 
+def fetch_many(symbols, max_workers=8):
+    """Fetch several tickers concurrently, keeping input order"""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(get_malaysia_esg, symbols))
+
+def stream_many(symbols, max_workers=8):
+    """Yield (symbol, data) pairs as each fetch finishes"""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(get_malaysia_esg, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def export_rows(rows, output_file):
+    import pandas as pd
+    pd.DataFrame([r for r in rows if r]).to_excel(output_file, index=False)
+
+_analyzer = None
+
 def analyze_with_llm(text):
-    """Use OpenAI GPT for ESG analysis"""
+    """Use OpenAI GPT for ESG analysis of the full report, chunked and cached"""
+    global _analyzer
     if not API_KEYS['openai']:
         console.print("[yellow]LLM analysis disabled. Set OPENAI_API_KEY[/yellow]")
         return ""
     
-    from openai import OpenAI
-    client = OpenAI(api_key=API_KEYS['openai'])
-    
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{
-            "role": "user",
-            "content": f"Analyze this annual report text for ESG factors. Focus on Malaysian context. Return key findings in bullet points:\n\n{text}"
-        }]
-    )
-    return response.choices[0].message.content
+    if _analyzer is None:
+        from core.analysis import LLMAnalyzer, OpenAIBackend
+        _analyzer = LLMAnalyzer(backend=OpenAIBackend(api_key=API_KEYS['openai']))
+    return _analyzer.analyze_report(text, focus="Focus on Malaysian context.")
 
 def parse_annual_report(url):
     """Scrape and analyze annual reports"""
     try:
         console.print(f"[cyan]Fetching {url}[/cyan]")
-        response = requests.get(url)
-        
-        if url.endswith('.pdf'):
-            from PyPDF2 import PdfReader
-            pdf = PdfReader(response.content)
-            text = "\n".join([page.extract_text() for page in pdf.pages])
-        else:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            text = soup.get_text()
+        from core.reports import iter_report_pages
+        text = "\n".join(iter_report_pages(url))
         
-        analysis = analyze_with_llm(text[:15000])  # Limit context
+        analysis = analyze_with_llm(text)
         return analysis
     except Exception as e:
         console.print(f"[red]Error processing report: {e}[/red]")
         return None
 
-def display_esg(data):
-    """Rich terminal display"""
-    table = Table(show_header=True, header_style="bold magenta")
-    table.add_column("Symbol", style="cyan")
-    table.add_column("Environmental", justify="right")
-    table.add_column("Social", justify="right")
-    table.add_column("Governance", justify="right")
-    table.add_column("Source")
-    
-    for item in data:
-        table.add_row(
-            item['Symbol'],
-            str(item['Environment']),
-            str(item['Social']),
-            str(item['Governance']),
-            item['Source']
-        )
-    
-    console.print(table)
+def display_esg(results, total=None):
+    """Rich terminal display of (symbol, data) pairs, filled in as they arrive"""
+    from core.terminal_ui import LiveDashboard
+    columns = ["Symbol", "Environmental", "Social", "Governance", "Source"]
+    with LiveDashboard("Malaysia ESG", columns, total=total, console=console) as live:
+        for symbol, item in results:
+            if item is None:
+                live.add((symbol, '-', '-', '-', 'unavailable'), ok=False)
+                continue
+            live.add((item['Symbol'], item['Environment'], item['Social'], item['Governance'], item['Source']))
+    if live.overflowed:
+        live.page()
 
 def main():
     while True:
@@ -123,14 +122,13 @@ def main():
         
         if choice == '1':
             symbols = input("Enter tickers (e.g., 1155.KL, MAYBANK.MY): ").split()
-            data = [get_malaysia_esg(sym) for sym in symbols]
-            display_esg([d for d in data if d])
+            display_esg(stream_many(symbols), total=len(symbols))
         
         elif choice == '2':
             symbols = input("Enter tickers to export: ").split()
             output_file = input("Output filename (e.g., esg_data.xlsx): ")
-            data = [get_malaysia_esg(sym) for sym in symbols]
-            pd.DataFrame([d for d in data if d]).to_excel(output_file, index=False)
+            data = fetch_many(symbols)
+            export_rows(data, output_file)
             console.print(f"[green]Data saved to {output_file}[/green]")
         
         elif choice == '3':
@@ -141,8 +139,8 @@ def main():
         elif choice == '4':
             symbols = input("Enter tickers: ").split()
             output_file = input("Output filename: ")
-            data = [get_malaysia_esg(sym) for sym in symbols]
-            pd.DataFrame([d for d in data if d]).to_excel(output_file, index=False)
+            data = fetch_many(symbols)
+            export_rows(data, output_file)
             console.print(f"[green]Full export completed to {output_file}[/green]")
         
         elif choice == '5':
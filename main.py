@@ -1,6 +1,7 @@
 from core.esg_engine import ESGEngine
 from core.terminal_ui import TerminalUI
 from core.data_export import DataExporter
+import argparse
 import sys
 
 class ESGApp:
@@ -8,6 +9,8 @@ class ESGApp:
         self.engine = ESGEngine()
         self.ui = TerminalUI()
         self.exporter = DataExporter()
+        self.results = {}
+        self.index = None
         
     def run(self):
         while True:
@@ -30,16 +33,209 @@ class ESGApp:
                 self.ui.console.print("[red]Invalid choice![/]")
 
     def view_data_flow(self):
-        country = input("Enter country code (e.g., MY, US): ").upper()
+        country = input("Enter country code (e.g., MY, US; blank to detect from the ticker): ").upper()
         ticker = input("Enter ticker (e.g., MAYBANK.KL, AAPL.US): ")
+        country, ticker = self.engine.resolve(country, ticker)
         
-        self.ui.show_loading("Fetching ESG Data")
-        data = self.engine.get_esg_data(country, ticker)
+        with self.ui.console.status(f"Fetching ESG data for {ticker}..."):
+            data = self.engine.get_esg_data(country, ticker)
         
         if 'error' in data:
             self.ui.console.print("[red]Failed to fetch data[/]")
         else:
+            self._remember(country, ticker, data)
             self.ui.display_esg(data)
 
+    def export_flow(self):
+        if not self.results:
+            self.ui.console.print("[yellow]Nothing to export yet - view some ESG data first[/]")
+            return
+        filename = input("Output filename (e.g., esg_report.xlsx): ") or "esg_report.xlsx"
+
+        from core.metrics_store import MetricFrame
+        frame = MetricFrame().extend(
+            (country, ticker, data) for ticker, (country, data) in self.results.items())
+        self.exporter.to_excel(frame, filename)
+
+    def cross_analysis(self):
+        raw = input("Tickers to add as TICKER or COUNTRY:TICKER, comma-separated (blank to skip): ")
+        pairs = [item.strip().rpartition(':')[::2] for item in raw.split(',') if item.strip()]
+        if pairs:
+            self.fetch_live(self.engine.resolve_many((country.upper(), ticker) for country, ticker in pairs))
+
+        index = self._cross_index()
+        metrics = index.metrics()
+        if not metrics:
+            self.ui.console.print("[yellow]No numeric metrics collected yet[/]")
+            return
+
+        metric = input(f"Metric ({', '.join(metrics)}): ") or metrics[0]
+        self.ui.display_table(f"Top {metric}", ["Ticker", "Value", "Percentile"], [
+            (ticker, f"{value:.2f}", f"{index.percentile_rank(ticker, metric):.1f}")
+            for ticker, value in index.top_n(metric, 10)
+        ])
+        self.ui.display_table(f"{metric} by Country", ["Country", "Count", "Mean", "Min", "Max"], [
+            (country, str(stats['count']), f"{stats['mean']:.2f}", f"{stats['min']:.2f}", f"{stats['max']:.2f}")
+            for country, stats in sorted(index.country_aggregates(metric).items())
+        ])
+
+    def fetch_live(self, pairs):
+        """Fetch (country, ticker) pairs, showing each result as it arrives."""
+        with self.ui.live("Fetching ESG data", ["Ticker", "Country", "Company", "Metrics"],
+                          total=len(pairs)) as live:
+            for country, ticker, data in self.engine.get_esg_data_many(pairs):
+                if 'error' in data:
+                    live.add((ticker, country, data['error'], ''), ok=False)
+                    continue
+                self._remember(country, ticker, data)
+                live.add((ticker, country, data.get('company', ''), ', '.join(
+                    f"{metric['name']} {metric.get('value')}" for metric in data.get('metrics', [])
+                    if metric and metric.get('name'))))
+        if live.overflowed and input("Browse all results? [y/N]: ").strip().lower() == 'y':
+            live.page()
+
+    def _remember(self, country: str, ticker: str, data: dict):
+        self.results[ticker] = (country, data)
+        if self.index is not None:
+            self.index.add(country, ticker, data)
+
+    def _cross_index(self):
+        if self.index is None:
+            from core.cross_market import CrossMarketIndex
+            self.index = CrossMarketIndex()
+            for ticker, (country, data) in self.results.items():
+                self.index.add(country, ticker, data)
+        return self.index
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Global ESG Intelligence Platform")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="report per-module import cost of a cold start and exit")
+    parser.add_argument('--metrics-port', type=int, help="serve Prometheus metrics on this port")
+    parser.add_argument('--metrics-file', help="write Prometheus metrics to this file on exit")
+    parser.add_argument('--trace-log', type=argparse.FileType('a'),
+                        help="append a JSON Lines trace of fetch/parse/export stages")
+    subparsers = parser.add_subparsers(dest='command')
+
+    batch = subparsers.add_parser('batch', help="fetch tickers non-interactively and stream results")
+    batch.add_argument('input', nargs='?', type=argparse.FileType('r'), default=sys.stdin,
+                       help="file with one TICKER or COUNTRY TICKER per line (default: stdin)")
+    batch.add_argument('--country', default='',
+                       help="country code for lines without one (default: route by ticker suffix)")
+    batch.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    batch.add_argument('--concurrency', type=int, default=8)
+    batch.add_argument('--per-host', type=int, default=2,
+                       help="maximum concurrent requests against one exchange")
+    batch.add_argument('--timeout', type=float, default=None, help="per-request timeout in seconds")
+    batch.add_argument('--output', help="export to a .csv, .xlsx or .parquet file instead of stdout")
+    batch.add_argument('--append', action='store_true', help="append to an existing --output file")
+
+    refresh = subparsers.add_parser('refresh', help="keep a ticker universe fresh and emit score changes")
+    refresh.add_argument('input', nargs='?', type=argparse.FileType('r'), default=None,
+                         help="tickers to add to the tracked universe, same format as batch")
+    refresh.add_argument('--country', default='',
+                         help="country code for lines without one (default: route by ticker suffix)")
+    refresh.add_argument('--feed', type=argparse.FileType('a'), default=sys.stdout,
+                         help="append the JSON Lines change feed here (default: stdout)")
+    refresh.add_argument('--state', default='.esg_refresh.sqlite', help="schedule database")
+    refresh.add_argument('--once', action='store_true', help="refresh what is due and exit")
+
+    crawl = subparsers.add_parser('crawl', help="crawl a whole ticker universe across worker processes")
+    crawl.add_argument('input', nargs='?', type=argparse.FileType('r'), default=None,
+                       help="tickers to queue, same format as batch (omit to resume the queue in --state)")
+    crawl.add_argument('--country', default='',
+                       help="country code for lines without one (default: route by ticker suffix)")
+    crawl.add_argument('--state', default='.esg_crawl.sqlite', help="work queue and checkpoint database")
+    crawl.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    crawl.add_argument('--chunk', type=int, default=200, help="tickers a worker claims at a time")
+    crawl.add_argument('--concurrency', type=int, default=8, help="concurrent fetches per worker")
+    crawl.add_argument('--per-host', type=int, default=2,
+                       help="maximum concurrent requests against one exchange, per worker")
+    crawl.add_argument('--timeout', type=float, default=None, help="per-request timeout in seconds")
+    crawl.add_argument('--attempts', type=int, default=2, help="fetch attempts before a ticker is marked failed")
+    crawl.add_argument('--retry-failed', action='store_true', help="queue tickers that failed last time again")
+    crawl.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    crawl.add_argument('--output', help="export merged results to a .csv, .xlsx or .parquet file instead of stdout")
+
+    history = subparsers.add_parser('history', help="query stored observations as JSON Lines")
+    history.add_argument('input', nargs='?', type=argparse.FileType('r'), default=None,
+                         help="tickers to query, same format as batch (default: all)")
+    history.add_argument('--country', default='',
+                         help="country code for lines without one (default: route by ticker suffix)")
+    history.add_argument('--as-of', help="latest value of each metric at this date or time")
+    history.add_argument('--since', help="changes on or after this date or time")
+    history.add_argument('--until', help="changes on or before this date or time")
+    history.add_argument('--name', action='append', help="only this metric name (repeatable)")
+    return parser.parse_args(argv)
+
+def main(args):
+    if args.profile_startup:
+        from core.profiling import report_startup
+        report_startup()
+    elif args.command == 'batch':
+        from core.batch import run_batch
+        counts = run_batch(args.input, fmt=args.format, country=args.country,
+                           concurrency=args.concurrency, per_host=args.per_host,
+                           timeout=args.timeout, output=args.output, append=args.append)
+        print(f"{counts['ok']} fetched, {counts['error']} failed", file=sys.stderr)
+    elif args.command == 'refresh':
+        from core.batch import read_pairs
+        from core.refresh import RefreshService
+        service = RefreshService(state_path=args.state, feed=args.feed)
+        if args.input:
+            service.track(read_pairs(args.input, args.country))
+        if args.once:
+            counts = service.run_once()
+            print(", ".join(f"{count} {name}" for name, count in counts.items()), file=sys.stderr)
+        else:
+            service.run_forever()
+    elif args.command == 'crawl':
+        from core.crawl import run_crawl
+        counts = run_crawl(args.input, fmt=args.format, country=args.country, output=args.output,
+                           retry_failed=args.retry_failed, state_path=args.state, workers=args.workers,
+                           chunk=args.chunk, concurrency=args.concurrency, per_host=args.per_host,
+                           timeout=args.timeout, attempts=args.attempts)
+        print(f"{counts['done']} fetched, {counts['failed']} failed", file=sys.stderr)
+    elif args.command == 'history':
+        query_history(args)
+    else:
+        ESGApp().run()
+
+def query_history(args):
+    import json
+    import numpy as np
+    from core.batch import read_pairs
+    engine = ESGEngine()
+    if engine.history is None:
+        sys.exit("History is disabled; add a 'history' section to config/sources.yaml")
+    tickers = countries = None
+    if args.input:
+        pairs = [(country, engine.routing.symbol(ticker, country))
+                 for country, ticker in engine.resolve_many(read_pairs(args.input, args.country))]
+        countries = {country for country, _ in pairs}
+        tickers = {ticker for _, ticker in pairs}
+    if args.as_of:
+        rows = engine.history.as_of(args.as_of, tickers, args.name, countries)
+    else:
+        rows = engine.history.range(tickers, args.since, args.until, args.name, countries)
+    for i in range(len(rows['observed'])):
+        print(json.dumps({
+            'country': rows['country'][i], 'ticker': rows['ticker'][i], 'metric': rows['metric'][i],
+            'source': rows['source'][i], 'observed': str(rows['observed'][i]),
+            'value': rows['text'][i] if rows['text'][i] is not None else float(rows['value'][i]),
+            'updated': None if np.isnat(rows['updated'][i]) else str(rows['updated'][i]),
+        }))
+
 if __name__ == "__main__":
-    ESGApp().run()
\ No newline at end of file
+    args = parse_args()
+    if args.metrics_port or args.metrics_file or args.trace_log:
+        from core.instrumentation import metrics
+        if args.trace_log:
+            metrics.set_trace_log(args.trace_log)
+        if args.metrics_port:
+            metrics.serve(args.metrics_port)
+    try:
+        main(args)
+    finally:
+        if args.metrics_file:
+            metrics.write_prometheus(args.metrics_file)
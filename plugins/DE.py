@@ -1,26 +1,32 @@
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from core.instrumentation import metrics
+from core.plugin_api import Capabilities
+from core.transport import HTTPTransport, get_transport
 
-def get_esg_data(ticker: str) -> Dict[str, Any]:
+SOURCE = 'Deutsche Börse ESG'
+CAPABILITIES = Capabilities(hosts=['deutsche-boerse.com'])
+
+def get_esg_data(ticker: str, transport: Optional[HTTPTransport] = None) -> Dict[str, Any]:
     """Germany ESG data from Deutsche Börse"""
     try:
         # ESG Data API (example endpoint)
         url = f"https://deutsche-boerse.com/api/esg/{ticker}"
-        response = requests.get(url, timeout=10)
+        payload = (transport or get_transport()).get(url).json()
         
         return {
-            'company': response.json()['companyName'],
+            'company': payload['companyName'],
             'metrics': [
                 {
                     'name': 'ESG Risk Score',
-                    'value': response.json()['riskScore'],
+                    'value': payload['riskScore'],
                     'source': 'Deutsche Börse ESG',
-                    'updated': response.json()['lastUpdated']
+                    'updated': payload['lastUpdated']
                 },
                 _get_eu_taxonomy_data(ticker)
             ]
         }
-    except:
+    except Exception as e:
+        metrics.fallback(SOURCE, e)
         return _fallback_germany(ticker)
 
 def _get_eu_taxonomy_data(ticker):
@@ -1,11 +1,18 @@
+import os
 import xml.etree.ElementTree as ET
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from core.instrumentation import metrics
+from core.plugin_api import Capabilities
+from core.transport import HTTPTransport, get_transport
 
-def get_esg_data(ticker: str) -> Dict[str, Any]:
+SOURCE = 'London Stock Exchange'
+CAPABILITIES = Capabilities(hosts=['api.londonstockexchange.com'])
+
+def get_esg_data(ticker: str, transport: Optional[HTTPTransport] = None) -> Dict[str, Any]:
     """UK ESG data from London Stock Exchange"""
     try:
         # LSEG ESG API (example)
-        response = requests.get(
+        response = (transport or get_transport()).get(
             f"https://api.londonstockexchange.com/esg/{ticker}",
             headers={'Authorization': f'Bearer {os.getenv("LSE_API_KEY")}'}
         )
@@ -18,5 +25,6 @@ def get_esg_data(ticker: str) -> Dict[str, Any]:
                 _get_ftse4good_rating(ticker)
             ]
         }
-    except:
+    except Exception as e:
+        metrics.fallback(SOURCE, e)
         return _fallback_uk(ticker)
\ No newline at end of file
@@ -1,31 +1,63 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from core.batching import Listing
+from core.extract import Field, require
+from core.instrumentation import metrics
+from core.plugin_api import Capabilities
+from core.transport import HTTPTransport, get_transport
 
-def get_esg_data(ticker: str) -> Dict[str, Any]:
+SOURCE = 'Tokyo Stock Exchange'
+CAPABILITIES = Capabilities(batch=True, hosts=['www.jpx.co.jp'], max_batch=500)
+
+FIELDS = {
+    'company': Field('h1', cls='company-name'),
+    'total_score': Field('td', label='Total Score', inside=Field('table', attrs={'id': 'esg-metrics'})),
+}
+
+def get_esg_data(ticker: str, transport: Optional[HTTPTransport] = None) -> Dict[str, Any]:
     """Japan ESG data from Tokyo Stock Exchange"""
     try:
         # TSE ESG Portal
         url = f"https://www.jpx.co.jp/english/listing/esg/{ticker}.html"
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        fields = (transport or get_transport()).get(url).extract(FIELDS)
         
         return {
-            'company': soup.find('h1', class_='company-name').text.strip(),
+            'company': require(fields, 'company'),
             'metrics': [
-                _parse_jpx_esg_table(soup),
+                _parse_jpx_esg_table(fields),
                 _get_carbon_intensity(ticker)
             ]
         }
     except Exception as e:
+        metrics.fallback(SOURCE, e)
         return _fallback_japan(ticker)
 
-def _parse_jpx_esg_table(soup):
-    # Extract ESG metrics from TSE's standardized table
-    table = soup.find('table', {'id': 'esg-metrics'})
+# One row per securities code on TSE's exchange-wide ESG listing
+LISTING = Listing("https://www.jpx.co.jp/english/listing/esg-listing.html", Field('tr'), 'data-code', {
+    'company': Field('td', cls='name'),
+    'total_score': Field('td', cls='score'),
+})
+
+def get_esg_data_batch(tickers: List[str], transport: Optional[HTTPTransport] = None) -> Dict[str, Dict[str, Any]]:
+    """Many tickers from one fetch of the TSE ESG listing; unlisted ones are left for the caller to fetch singly"""
+    rows = LISTING.rows(transport or get_transport())
+    results = {}
+    for ticker in tickers:
+        try:
+            fields = rows[ticker]
+            results[ticker] = {
+                'company': require(fields, 'company'),
+                'metrics': [_parse_jpx_esg_table(fields), _get_carbon_intensity(ticker)]
+            }
+        except (KeyError, ValueError):
+            continue
+    return results
+
+def _parse_jpx_esg_table(fields):
+    # Total from TSE's standardized ESG metrics table
     return {
         'name': 'JPX ESG Score',
-        'value': table.find('td', text='Total Score').find_next('td').text,
+        'value': require(fields, 'total_score'),
         'source': 'Tokyo Stock Exchange',
         'updated': datetime.now().strftime('%Y-%m-%d')
     }
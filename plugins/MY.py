@@ -1,28 +1,60 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from core.batching import Listing
+from core.extract import Field, require
+from core.instrumentation import metrics
+from core.plugin_api import Capabilities
+from core.transport import HTTPTransport, get_transport
 
-def get_esg_data(ticker: str) -> Dict[str, Any]:
+SOURCE = 'Bursa Malaysia'
+CAPABILITIES = Capabilities(batch=True, hosts=['www.bursamalaysia.com'], max_batch=500)
+
+FIELDS = {
+    'company': Field('h1', cls='company-name'),
+    'env': Field('div', cls='esg-env-score'),
+    'soc': Field('div', cls='esg-soc-score'),
+    'updated': Field('div', cls='esg-updated'),
+}
+
+def get_esg_data(ticker: str, transport: Optional[HTTPTransport] = None) -> Dict[str, Any]:
     """Malaysia-specific ESG data from Bursa Malaysia"""
     try:
         url = f"https://www.bursamalaysia.com/market/company/{ticker}"
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        return {
-            'company': _get_company_name(soup),
-            'metrics': [
-                {'name': 'Environmental', 'value': _extract_score(soup, 'env'),
-                 'source': 'Bursa Malaysia', 'updated': _get_date()},
-                {'name': 'Social', 'value': _extract_score(soup, 'soc'),
-                 'source': 'Bursa Malaysia', 'updated': _get_date()}
-            ]
-        }
+        fields = (transport or get_transport()).get(url).extract(FIELDS)
+        return _result(fields)
     except Exception as e:
+        metrics.fallback(SOURCE, e)
         return _fallback_data(ticker)
 
-def _get_company_name(soup):
-    return soup.find('h1', class_='company-name').text.strip()
+# One row per stock code on the FTSE4Good Bursa Malaysia ratings page
+LISTING = Listing("https://www.bursamalaysia.com/market/esg/listing", Field('tr'), 'data-code', {
+    'company': Field('td', cls='name'),
+    'env': Field('td', cls='env'),
+    'soc': Field('td', cls='soc'),
+    'updated': Field('td', cls='updated'),
+})
+
+def get_esg_data_batch(tickers: List[str], transport: Optional[HTTPTransport] = None) -> Dict[str, Dict[str, Any]]:
+    """Many tickers from one fetch of Bursa's ESG ratings listing.
+
+    Tickers the listing does not cover are left out; the caller fetches those
+    from their company pages.
+    """
+    rows = LISTING.rows(transport or get_transport())
+    results = {}
+    for ticker in tickers:
+        try:
+            results[ticker] = _result(rows[ticker])
+        except (KeyError, ValueError):
+            continue
+    return results
 
-def _extract_score(soup, category):
-    return soup.find('div', class_=f'esg-{category}-score').text.strip()
\ No newline at end of file
+def _result(fields) -> Dict[str, Any]:
+    return {
+        'company': require(fields, 'company'),
+        'metrics': [
+            {'name': 'Environmental', 'value': require(fields, 'env'),
+             'source': 'Bursa Malaysia', 'updated': fields['updated']},
+            {'name': 'Social', 'value': require(fields, 'soc'),
+             'source': 'Bursa Malaysia', 'updated': fields['updated']}
+        ]
+    }
@@ -1,9 +1,18 @@
-def get_esg_data(ticker: str) -> Dict[str, Any]:
+from typing import Dict, Any, Optional
+from core.instrumentation import metrics
+from core.plugin_api import Capabilities
+from core.reports import iter_report_pages
+from core.transport import HTTPTransport
+
+SOURCE = 'SGX'
+CAPABILITIES = Capabilities(hosts=['api.sgx.com'])
+
+def get_esg_data(ticker: str, transport: Optional[HTTPTransport] = None) -> Dict[str, Any]:
     """Singapore ESG data from SGX"""
     try:
         # SGX Sustainability Reports
         pdf_url = f"https://api.sgx.com/sustainability/{ticker}"
-        pdf_text = _extract_pdf_text(pdf_url)
+        pdf_text = _extract_pdf_text(pdf_url, transport)
         
         return {
             'company': _extract_company_name(pdf_text),
@@ -12,5 +21,9 @@ def get_esg_data(ticker: str) -> Dict[str, Any]:
                 _get_carbon_pricing_data(ticker)
             ]
         }
-    except:
-        return _fallback_sg(ticker)
\ No newline at end of file
+    except Exception as e:
+        metrics.fallback(SOURCE, e)
+        return _fallback_sg(ticker)
+
+def _extract_pdf_text(pdf_url, transport=None):
+    return '\n'.join(iter_report_pages(pdf_url, transport))
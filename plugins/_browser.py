@@ -0,0 +1,176 @@
+# plugins/_browser.py
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+class FixtureElement:
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def text(self) -> str:
+        return self.node.get_text(strip=True)
+
+class FixtureDriver:
+    """Selenium-compatible stand-in that renders local HTML fixtures instead of Chrome.
+
+    A URL maps to ``<fixtures_dir>/<path with / replaced by _>.html``.
+    """
+
+    def __init__(self, fixtures_dir):
+        self.fixtures_dir = Path(fixtures_dir)
+        self.soup = None
+        self.current_url = None
+
+    def get(self, url: str):
+        from bs4 import BeautifulSoup
+        name = urlparse(url).path.strip('/').replace('/', '_') + '.html'
+        self.current_url = url
+        self.soup = BeautifulSoup((self.fixtures_dir / name).read_text(encoding='utf-8'), 'html.parser')
+
+    def find_element(self, by: str, value: str) -> FixtureElement:
+        node = self._select(by, value)
+        if node is None:
+            raise LookupError(f"No element {by}={value} in {self.current_url}")
+        return FixtureElement(node)
+
+    def find_elements(self, by: str, value: str):
+        if by == 'class name':
+            return [FixtureElement(n) for n in self.soup.find_all(class_=value)]
+        return [FixtureElement(n) for n in self.soup.select(value)]
+
+    def execute_script(self, script: str):
+        return 1
+
+    def quit(self):
+        self.soup = None
+
+    def _select(self, by: str, value: str):
+        if by == 'class name':
+            return self.soup.find(class_=value)
+        if by == 'id':
+            return self.soup.find(id=value)
+        return self.soup.select_one(value)
+
+def chrome_factory():
+    from selenium import webdriver
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    return webdriver.Chrome(options=options)
+
+class BrowserPool:
+    """Bounded pool of reusable headless browser sessions.
+
+    Sessions are created lazily up to ``size``; further callers queue until one is
+    returned. A session is health-checked on checkout, recycled after
+    ``max_pages`` page loads and replaced if the work using it raises.
+    """
+
+    def __init__(self, size: int = 2, max_pages: int = 50, checkout_timeout: float = 60,
+                 factory: Optional[Callable] = None):
+        self.size = size
+        self.max_pages = max_pages
+        self.checkout_timeout = checkout_timeout
+        self.factory = factory or chrome_factory
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self):
+        driver, pages = self._checkout()
+        try:
+            yield driver
+        except Exception:
+            # Page-level failures leave the browser usable; only drop it if it is broken
+            if self._healthy(driver):
+                self._idle.put((driver, pages + 1))
+            else:
+                self._discard(driver)
+            raise
+        else:
+            pages += 1
+            if pages >= self.max_pages:
+                self._discard(driver)
+            else:
+                self._idle.put((driver, pages))
+
+    def close(self):
+        while True:
+            try:
+                driver, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            try:
+                driver, pages = self._idle.get_nowait()
+            except queue.Empty:
+                if self._reserve():
+                    return self._create(), 0
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No browser session free after {self.checkout_timeout}s")
+                # Poll so a slot freed by a discarded session is noticed too
+                try:
+                    driver, pages = self._idle.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    continue
+
+            if self._healthy(driver):
+                return driver, pages
+            self._discard(driver)
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return True
+            return False
+
+    def _create(self):
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _healthy(self, driver) -> bool:
+        try:
+            driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver):
+        with self._lock:
+            self._created -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> BrowserPool:
+    """Shared pool sized by ESG_BROWSER_POOL_SIZE; ESG_BROWSER_FIXTURES switches to local fixtures."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            fixtures = os.getenv('ESG_BROWSER_FIXTURES')
+            factory = (lambda: FixtureDriver(fixtures)) if fixtures else None
+            _pool = BrowserPool(size=int(os.getenv('ESG_BROWSER_POOL_SIZE', '2')), factory=factory)
+        return _pool
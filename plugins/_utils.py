@@ -1,12 +1,98 @@
 # plugins/_utils.py
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple, Union
 
-def financial_unit_converter(value, from_currency, to_currency):
-    # Handle currency conversions for comparability
-    pass
+import numpy as np
+import yaml
 
-def sustainability_metrics_normalizer(raw_data):
-    # Convert different ESG frameworks to common scale
-    pass
+from core.instrumentation import metrics
+from core.reports import HTMLParser, PDFParser, XMLParser
+
+# Native range of each source's headline score and whether higher means worse.
+# Everything is mapped onto 0-100 where higher is better.
+SOURCE_SCALES: Dict[str, Tuple[float, float, bool]] = {
+    'Bursa Malaysia': (0.0, 4.0, False),           # FTSE4Good Bursa Malaysia 0-4 rating
+    'Tokyo Stock Exchange': (0.0, 100.0, False),
+    'Deutsche Börse ESG': (0.0, 100.0, True),      # risk score
+    'London Stock Exchange': (0.0, 100.0, False),
+    'Alpha Vantage': (0.0, 100.0, False),
+    'Yahoo Finance': (0.0, 50.0, True),            # Sustainalytics risk score
+}
+
+ArrayLike = Union[np.ndarray, Sequence]
+
+@lru_cache(maxsize=None)
+def _load_yaml(path: str) -> Dict:
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+def fx_rates(path: str = 'config/fx_rates.yaml') -> Dict[str, float]:
+    return _load_yaml(path)['rates']
+
+def country_currencies(path: str = 'config/countries.yaml') -> Dict[str, str]:
+    return {code: info['currency'] for code, info in _load_yaml(path)['countries'].items()}
+
+def _lookup(keys: ArrayLike, table: Dict[str, float], default: float = np.nan) -> np.ndarray:
+    """Map an array of string keys through ``table`` with one dict lookup per distinct key."""
+    keys = np.asarray(keys)
+    uniques, inverse = np.unique(keys, return_inverse=True)
+    mapped = np.array([table.get(key, default) for key in uniques], dtype=np.float64)
+    return mapped[inverse.reshape(keys.shape)]
+
+def financial_unit_converter(value: ArrayLike, from_currency: Union[str, ArrayLike],
+                             to_currency: str = 'USD', rates: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Convert currency amounts to ``to_currency`` for comparability.
+
+    ``value`` is an array and ``from_currency`` a single code or an array of codes
+    aligned with it; unknown currencies produce NaN. ``rates`` give the USD value of
+    one unit of each currency and default to config/fx_rates.yaml.
+    """
+    rates = rates or fx_rates()
+    values = np.asarray(value, dtype=np.float64)
+    if isinstance(from_currency, str):
+        to_usd = rates.get(from_currency, np.nan)
+    else:
+        to_usd = _lookup(from_currency, rates)
+    return values * to_usd / rates.get(to_currency, np.nan)
+
+def convert_country_values(value: ArrayLike, countries: ArrayLike, to_currency: str = 'USD',
+                           rates: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Convert amounts reported in each country's local currency (per countries.yaml)."""
+    currencies = country_currencies()
+    countries = np.asarray(countries)
+    uniques, inverse = np.unique(countries, return_inverse=True)
+    local = np.array([currencies.get(code, '') for code in uniques])[inverse]
+    return financial_unit_converter(value, local, to_currency, rates)
+
+@metrics.timed('normalize')
+def sustainability_metrics_normalizer(raw_data, sources: Optional[ArrayLike] = None,
+                                      scales: Optional[Dict[str, Tuple[float, float, bool]]] = None) -> np.ndarray:
+    """Convert different ESG frameworks to a common 0-100, higher-is-better scale.
+
+    ``raw_data`` is either a MetricFrame (values and sources are read from its
+    columns) or an array of scores with ``sources`` aligned to it. Scores from
+    sources without a known scale come back as NaN.
+    """
+    scales = scales or SOURCE_SCALES
+    if hasattr(raw_data, 'codes'):
+        values = raw_data.values
+        source_codes = raw_data.codes('source')
+        categories = raw_data.categories('source')
+    else:
+        values = np.asarray(raw_data, dtype=np.float64)
+        categories, source_codes = np.unique(np.asarray(sources), return_inverse=True)
+        source_codes = source_codes.reshape(values.shape)
+
+    # One row of (low, high, inverted) per distinct source, plus a NaN row for code -1
+    table = np.full((len(categories) + 1, 3), np.nan)
+    for code, name in enumerate(categories):
+        if name in scales:
+            table[code] = scales[name]
+
+    low, high, inverted = table[source_codes].T
+    scaled = np.clip((values - low) / (high - low), 0.0, 1.0)
+    scaled = np.where(inverted == 1.0, 1.0 - scaled, scaled)
+    return scaled * 100.0
 
 def report_parser_factory(file_type):
     # Handle PDF/HTML/XML parsing
@@ -14,4 +100,4 @@ def report_parser_factory(file_type):
         'pdf': PDFParser,
         'html': HTMLParser,
         'xml': XMLParser
-    }[file_type]
\ No newline at end of file
+    }[file_type]
@@ -1,14 +1,19 @@
 import os
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from core.instrumentation import metrics
+from core.plugin_api import Capabilities
+from core.transport import HTTPTransport, get_transport
 
-def get_esg_data(ticker: str) -> Dict[str, Any]:
+SOURCE = 'Alpha Vantage'
+CAPABILITIES = Capabilities(hosts=['www.alphavantage.co'])
+
+def get_esg_data(ticker: str, transport: Optional[HTTPTransport] = None) -> Dict[str, Any]:
     """Fallback using Alpha Vantage"""
     api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
     url = f"https://www.alphavantage.co/query?function=ESG_SCORE&symbol={ticker}&apikey={api_key}"
     
     try:
-        response = requests.get(url)
+        response = (transport or get_transport()).get(url)
         data = response.json()
         return {
             'company': data.get('name', ticker),
@@ -17,5 +22,6 @@ def get_esg_data(ticker: str) -> Dict[str, Any]:
                  'source': 'Alpha Vantage', 'updated': data.get('Last Updated')}
             ]
         }
-    except:
-        return {'error': 'Data unavailable'}
\ No newline at end of file
+    except Exception as e:
+        metrics.fallback(SOURCE, e)
+        return {'error': 'Data unavailable'}
@@ -1,9 +1,12 @@
 # plugins/usa.py
-from bs4 import BeautifulSoup
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from core.plugin_api import Capabilities
+from core.transport import HTTPTransport
 
-def get_esg_data(ticker: str) -> Dict[str, Any]:
+SOURCE = 'SEC EDGAR'
+CAPABILITIES = Capabilities(hosts=['www.sec.gov'])
+
+def get_esg_data(ticker: str, transport: Optional[HTTPTransport] = None) -> Dict[str, Any]:
     """Handle NYSE/NASDAQ tickers with SEC integration"""
     exchange, symbol = _parse_ticker(ticker)
     